@@ -0,0 +1,119 @@
+# app/answer_keys.py
+"""
+Per-process cache of course answer keys for grading test attempts.
+
+An AnswerKey is all grading needs from a course: the question ids in order,
+a dict from id to position and the correct option indexes in an array of
+ints. No question text, options or pydantic models, so a cached key costs
+a few bytes per question and grading an attempt takes microseconds.
+
+Every write that can change a course's questions or answers gives the course
+a new ``answers_version`` token. Graders read the token with the course
+document they load anyway and only use a cached key whose version matches,
+so an edit made by another API process or the ingestion worker is never
+graded against a stale key. update_question and course deletion also drop
+the key from this process straight away.
+
+Configured through the environment:
+    ANSWER_KEY_CACHE_COURSES  answer keys kept per process (default: 512)
+"""
+import os
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+
+from app import metrics
+from app.question_store import find_questions
+from app.single_flight import SingleFlight
+
+CACHE_COURSES = int(os.environ.get("ANSWER_KEY_CACHE_COURSES", 512))
+
+VERSION_FIELD = "answers_version"
+
+
+def new_version() -> str:
+    return uuid.uuid4().hex
+
+
+class AnswerKey:
+    __slots__ = ("version", "question_ids", "positions", "answers")
+
+    def __init__(self, version: str, question_ids: Tuple[str, ...], answers: array):
+        self.version = version
+        self.question_ids = question_ids
+        self.positions = {question_id: position for position, question_id in enumerate(question_ids)}
+        self.answers = answers
+
+    @classmethod
+    def from_questions(cls, version: str, questions: Iterable[Dict[str, Any]]) -> "AnswerKey":
+        """Key from question dicts with at least id and correct_answer, in order"""
+        questions = list(questions)
+        return cls(
+            version,
+            tuple(question["id"] for question in questions),
+            array("i", (question["correct_answer"] for question in questions)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def grade(self, answers: Dict[str, int]) -> int:
+        """Number of correct answers; ids not in the course are ignored"""
+        positions, key = self.positions, self.answers
+        correct = 0
+        for question_id, chosen in answers.items():
+            position = positions.get(question_id)
+            if position is not None and key[position] == chosen:
+                correct += 1
+        return correct
+
+
+_lock = threading.Lock()
+_keys: "OrderedDict[str, AnswerKey]" = OrderedDict()
+_loads = SingleFlight("answer_key")
+
+
+def cached(course_id: str, version: str):
+    with _lock:
+        key = _keys.get(course_id)
+        if key is None or key.version != version:
+            return None
+        _keys.move_to_end(course_id)
+        return key
+
+
+def remember(course_id: str, key: AnswerKey):
+    with _lock:
+        _keys[course_id] = key
+        _keys.move_to_end(course_id)
+        while len(_keys) > CACHE_COURSES:
+            _keys.popitem(last=False)
+
+
+def invalidate(course_id: str):
+    with _lock:
+        _keys.pop(course_id, None)
+
+
+def clear():
+    with _lock:
+        _keys.clear()
+
+
+async def get_answer_key(db, course_id: str, version: str) -> AnswerKey:
+    """The course's answer key at ``version``, loaded from the questions collection on a miss"""
+    key = cached(course_id, version)
+    if key is not None:
+        metrics.inc("answer_key_cache", result="hit")
+        return key
+    metrics.inc("answer_key_cache", result="miss")
+    return await _loads.do((course_id, version), lambda: _load(db, course_id, version))
+
+
+async def _load(db, course_id: str, version: str) -> AnswerKey:
+    questions = await find_questions(db, course_id, ["id", "correct_answer"]).to_list(None)
+    key = AnswerKey.from_questions(version, questions)
+    remember(course_id, key)
+    return key
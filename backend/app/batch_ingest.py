@@ -0,0 +1,279 @@
+# app/batch_ingest.py
+"""
+Offline batch conversion of past-question PDFs.
+
+Parses every PDF under the given directories or globs in parallel worker
+processes, with the same extraction and parsers as an upload, and appends one
+JSON line per question (with its source file and 1-based page) to the output
+file. With --mongo each PDF also becomes a course, inserted in batches with
+insert_many.
+
+Progress is recorded per file in a JSONL file next to the output. Re-running
+the same command skips files already done, and output written for files that
+were not recorded as done is cut off first, so an interrupted run can simply
+be started again.
+
+    cd backend && python -m app.batch_ingest ~/past-questions --output questions.jsonl
+    cd backend && python -m app.batch_ingest "archive/**/*.pdf" --workers 8 --mongo
+"""
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import typer
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from app import course_payloads, limits, page_store, preflight, question_store
+from app.models import Course
+from app.pdf_parser import PARSER_VERSION, extract_and_parse, question_pages
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+# Course ids derive from the PDF's hash, so re-importing a file replaces its course
+COURSE_NAMESPACE = uuid.UUID("6f0c1a8e-5b0e-4e63-9d55-2f6d1c6b7a41")
+IMPORTED_BY = "batch-import"
+
+app = typer.Typer(add_completion=False, help=__doc__.split("\n\n")[0])
+
+
+def find_pdfs(sources: List[str]) -> List[Path]:
+    """PDF paths under each directory, matching each glob, or named directly"""
+    found = []
+    for source in sources:
+        path = Path(source).expanduser()
+        if path.is_dir():
+            found.extend(p for p in path.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file())
+        elif path.is_file():
+            found.append(path)
+        else:
+            found.extend(Path(p) for p in glob.glob(str(path), recursive=True) if p.lower().endswith(".pdf"))
+    # Stable order and no file twice, however the sources overlap
+    return sorted({p.resolve() for p in found})
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_file(path: str, keep_pages: bool = False) -> Dict[str, Any]:
+    """Parse one PDF. Runs in a batch worker process, under the parse limits."""
+    result: Dict[str, Any] = {"path": path}
+    try:
+        result["content_hash"] = file_hash(Path(path))
+        with limits.cpu_budget():
+            report = preflight.check_text_layer(path)
+            if report and report.rejection():
+                result["error"] = report.rejection()
+                return result
+            document, questions, result["extraction_backend"] = extract_and_parse(path)
+        result["pages"] = len(document.pages)
+        result["questions"] = [q.dict() for q in questions]
+        result["question_pages"] = question_pages(document, questions)
+        if keep_pages:
+            result["page_text"] = document.pages
+    except (Exception, limits.ResourceLimitExceeded) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+class Progress:
+    """Append-only record of finished files, with the output size after each"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: Dict[str, Dict[str, Any]] = {}
+        self.output_size = 0
+        if path.exists():
+            with open(path, "r+b") as progress_file:
+                valid_end = 0
+                for line in progress_file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # a record cut short by the interruption
+                    self.done[record["path"]] = record
+                    self.output_size = record["output_size"]
+                    valid_end += len(line)
+                progress_file.truncate(valid_end)
+        self._file = open(path, "a")
+
+    def is_done(self, path: Path) -> bool:
+        record = self.done.get(str(path))
+        if not record or record["error"]:
+            return False
+        stat = path.stat()
+        return record["size"] == stat.st_size and record["mtime"] == stat.st_mtime
+
+    def record(self, result: Dict[str, Any], output_size: int):
+        stat = Path(result["path"]).stat()
+        record = {
+            "path": result["path"],
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": result.get("content_hash"),
+            "questions": len(result.get("questions", [])),
+            "error": result.get("error"),
+            "output_size": output_size,
+        }
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done[record["path"]] = record
+
+    def close(self):
+        self._file.close()
+
+
+def question_lines(result: Dict[str, Any]) -> Iterator[str]:
+    for index, (question, page) in enumerate(zip(result["questions"], result["question_pages"])):
+        yield json.dumps({
+            "source": result["path"],
+            "content_hash": result["content_hash"],
+            "page": None if page is None else page + 1,
+            "index": index,
+            **question,
+        }) + "\n"
+
+
+def course_for(result: Dict[str, Any], description: str) -> Course:
+    return Course(
+        id=str(uuid.uuid5(COURSE_NAMESPACE, result["content_hash"])),
+        title=Path(result["path"]).stem.replace("_", " "),
+        description=description,
+        is_free=True,
+        price=0.0,
+        questions=result["questions"],
+        total_questions=len(result["questions"]),
+        created_by=IMPORTED_BY,
+        source_hash=result["content_hash"],
+        parser_version=PARSER_VERSION,
+        extraction_backend=result["extraction_backend"],
+    )
+
+
+class CourseWriter:
+    """Buffers parsed files and inserts their courses with one insert_many per batch"""
+
+    def __init__(self, db, batch_size: int, description: str):
+        self.db = db
+        self.batch_size = batch_size
+        self.description = description
+        self.pending: List[Dict[str, Any]] = []
+
+    def add(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Queue a file; returns the files whose courses are now stored"""
+        self.pending.append(result)
+        return self.flush() if len(self.pending) >= self.batch_size else []
+
+    def flush(self) -> List[Dict[str, Any]]:
+        flushed, self.pending = self.pending, []
+        with_questions = [result for result in flushed if result.get("questions")]
+        if with_questions:
+            for result in with_questions:
+                page_store.save_pages(self.db, result["content_hash"], result.pop("page_text"))
+            courses = [course_for(result, self.description) for result in with_questions]
+            questions = [
+                document
+                for course in courses
+                for document in question_store.question_documents(course.id, course.questions)
+            ]
+            # Replace courses left by an interrupted earlier run of the same files
+            course_ids = [course.id for course in courses]
+            self.db.courses.delete_many({"id": {"$in": course_ids}})
+            self.db.questions.delete_many({"course_id": {"$in": course_ids}})
+            self.db.questions.insert_many(questions, ordered=False)
+            self.db.courses.insert_many([question_store.course_document(course) for course in courses], ordered=False)
+            payloads = [course_payloads.payload_document(course.dict(), course.questions) for course in courses]
+            payloads = [operation for operation in payloads if operation is not None]
+            if payloads:
+                self.db.course_payloads.bulk_write(payloads, ordered=False)
+        return flushed
+
+
+def _connect():
+    load_dotenv(Path(__file__).parent.parent / ".env")
+    return MongoClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+
+
+@app.command()
+def ingest(
+    sources: List[str] = typer.Argument(..., help="PDF files, directories (searched recursively) or globs"),
+    output: Path = typer.Option(Path("questions.jsonl"), "--output", "-o", help="JSONL file of parsed questions"),
+    progress_file: Optional[Path] = typer.Option(None, "--progress", help="Progress file (default: <output>.progress)"),
+    workers: int = typer.Option(os.cpu_count() or 1, "--workers", "-w", min=1),
+    mongo: bool = typer.Option(False, "--mongo", help="Also insert a course per PDF (MONGO_URL, DB_NAME)"),
+    batch_size: int = typer.Option(50, "--batch-size", min=1, help="Courses per insert_many"),
+    description: str = typer.Option("Imported past questions", help="Description of inserted courses"),
+):
+    """Parse PDFs in parallel into JSONL, resuming where an earlier run stopped."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    progress = Progress(progress_file or output.with_name(output.name + ".progress"))
+
+    paths = find_pdfs(sources)
+    todo = [path for path in paths if not progress.is_done(path)]
+    logger.info("%d PDFs found, %d already done, %d to parse", len(paths), len(paths) - len(todo), len(todo))
+
+    output_size = output.stat().st_size if output.exists() else 0
+    if output_size < progress.output_size:
+        raise typer.BadParameter(
+            f"{output} is shorter than {progress.path} records; delete the progress file to start over",
+            param_hint="--output",
+        )
+    # Drop lines written for files that never made it into the progress file
+    with open(output, "a") as out:
+        out.truncate(progress.output_size)
+    writer = CourseWriter(_connect(), batch_size, description) if mongo else None
+
+    questions_total = failed = 0
+    with open(output, "a") as out, ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=limits.init_worker
+    ) as executor:
+
+        def finish(results: List[Dict[str, Any]]):
+            for result in results:
+                progress.record(result, out.tell())
+
+        remaining = iter(todo)
+        in_flight = set()
+        while True:
+            # Keep a bounded number of files queued so results stream out
+            for path in remaining:
+                in_flight.add(executor.submit(parse_file, str(path), mongo))
+                if len(in_flight) >= workers * 2:
+                    break
+            if not in_flight:
+                break
+            completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                result = future.result()
+                if "error" in result:
+                    failed += 1
+                    logger.warning("%s: %s", result["path"], result["error"])
+                else:
+                    questions_total += len(result["questions"])
+                    out.writelines(question_lines(result))
+                    logger.info("%s: %d questions", result["path"], len(result["questions"]))
+                out.flush()
+                finish(writer.add(result) if writer else [result])
+        if writer:
+            finish(writer.flush())
+
+    progress.close()
+    logger.info("Parsed %d PDFs: %d questions, %d failed", len(todo) - failed, questions_total, failed)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,183 @@
+# app/bulk_upload.py
+"""
+Bulk course uploads: several PDFs in one request, or one ZIP archive of PDFs,
+each becoming a course through an ingestion batch (see app/ingestion_jobs.py).
+
+An optional manifest gives each file's course details. It is uploaded next to
+the PDFs or stored in the ZIP as manifest.json or manifest.csv, and entries
+are matched to files by name:
+
+    file,title,description,price
+    gst104.pdf,GST104 Past Questions,Use of the library,500
+
+A JSON manifest is a list of such objects, or {"courses": [...]}. Files the
+manifest does not mention are titled after their file name and free.
+
+Configured through the environment:
+    PDF_BULK_MAX_FILES  most PDFs accepted in one bulk upload (default: 200)
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import zipfile
+import zlib
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import ingestion_jobs
+
+MAX_FILES = int(os.environ.get("PDF_BULK_MAX_FILES", 200))
+MANIFEST_NAMES = ("manifest.json", "manifest.csv")
+
+
+class BulkUploadError(Exception):
+    """The bulk upload as a whole cannot be accepted, e.g. an unreadable manifest."""
+
+
+class _AsyncReader:
+    """The async read() store_upload expects, over a blocking file object"""
+
+    def __init__(self, file):
+        self._file = file
+
+    async def read(self, size: int = -1) -> bytes:
+        return await asyncio.to_thread(self._file.read, size)
+
+
+def parse_manifest(name: str, content: bytes) -> Dict[str, Dict[str, Any]]:
+    """Manifest entries keyed by file name"""
+    try:
+        text = content.decode("utf-8-sig")
+        if name.lower().endswith(".csv"):
+            entries = list(csv.DictReader(io.StringIO(text)))
+        else:
+            entries = json.loads(text)
+            if isinstance(entries, dict):
+                entries = entries.get("courses", [])
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise BulkUploadError(f"Could not read manifest {name}: {e}")
+
+    manifest = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("file"):
+            raise BulkUploadError(f"Manifest entry without a file name: {entry!r}")
+        manifest[PurePosixPath(entry["file"]).name] = entry
+    return manifest
+
+
+def course_params(filename: str, entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Course fields for a file from its manifest entry, with defaults"""
+    entry = entry or {}
+    try:
+        price = float(entry.get("price") or 0)
+    except ValueError:
+        raise ValueError(f"Invalid price {entry['price']!r}")
+    is_free = entry.get("is_free")
+    if is_free in (None, ""):
+        is_free = price == 0
+    elif isinstance(is_free, str):
+        is_free = is_free.strip().lower() in ("1", "true", "yes")
+    return {
+        "title": entry.get("title") or PurePosixPath(filename).stem.replace("_", " "),
+        "description": entry.get("description") or "",
+        "is_free": bool(is_free),
+        "price": price,
+    }
+
+
+def _is_pdf_name(name: str) -> bool:
+    return name.lower().endswith(".pdf")
+
+
+def _zip_members(archive: zipfile.ZipFile) -> Tuple[List[zipfile.ZipInfo], Optional[zipfile.ZipInfo]]:
+    pdfs, manifest = [], None
+    for info in archive.infolist():
+        path = PurePosixPath(info.filename)
+        if info.is_dir() or path.name.startswith(".") or "__MACOSX" in path.parts:
+            continue
+        if path.name.lower() in MANIFEST_NAMES:
+            manifest = info
+        else:
+            pdfs.append(info)
+    return pdfs, manifest
+
+
+def _open_archive(file) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo], Dict[str, Dict[str, Any]]]:
+    """Read a ZIP's directory and manifest; blocking, so run it in a thread"""
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise BulkUploadError("The uploaded archive is not a valid ZIP file")
+    members, manifest_member = _zip_members(archive)
+    manifest = {}
+    if manifest_member is not None:
+        try:
+            content = archive.read(manifest_member)
+        except (zipfile.BadZipFile, zlib.error, OSError) as e:
+            raise BulkUploadError(f"Could not read manifest {manifest_member.filename}: {e}")
+        manifest = parse_manifest(manifest_member.filename, content)
+    return archive, members, manifest
+
+
+async def stage_bulk_upload(db, files, manifest_file=None) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """Store every PDF of a bulk upload in GridFS
+
+    ``files`` are UploadFiles: PDFs, or a single ZIP archive. Returns the
+    stored uploads, ready for enqueue_course_batch(), and the files refused.
+    """
+    sources: List[Tuple[str, Any]] = []  # (filename, async readable)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    archive = None
+
+    if any(not upload.filename for upload in files):
+        raise BulkUploadError("Every uploaded file needs a file name")
+    if len(files) == 1 and files[0].filename.lower().endswith(".zip"):
+        archive, members, manifest = await asyncio.to_thread(_open_archive, files[0].file)
+        sources = [(info.filename, info) for info in members]
+    else:
+        sources = [(upload.filename, upload) for upload in files]
+
+    if manifest_file is not None:
+        manifest = parse_manifest(manifest_file.filename or "manifest.json", await manifest_file.read())
+    if len(sources) > MAX_FILES:
+        raise BulkUploadError(f"A bulk upload may hold at most {MAX_FILES} PDFs, got {len(sources)}")
+
+    uploads, rejected = [], []
+    for filename, source in sources:
+        name = PurePosixPath(filename).name
+        if not _is_pdf_name(name):
+            rejected.append({"filename": filename, "error": "Not a PDF file"})
+            continue
+        try:
+            params = course_params(name, manifest.pop(name, None))
+        except ValueError as e:
+            rejected.append({"filename": filename, "error": str(e)})
+            continue
+
+        try:
+            if archive is not None:
+                with await asyncio.to_thread(archive.open, source) as member:
+                    stored = await ingestion_jobs.store_upload(db, _AsyncReader(member), name)
+            else:
+                stored = await ingestion_jobs.store_upload(db, source, name)
+        except ingestion_jobs.UploadTooLarge as e:
+            rejected.append({"filename": filename, "error": str(e)})
+            continue
+        except (zipfile.BadZipFile, zlib.error, OSError) as e:
+            rejected.append({"filename": filename, "error": f"Could not read file from archive: {e}"})
+            continue
+
+        file_id, content_hash, file_size = stored
+        uploads.append({
+            "file_id": file_id,
+            "content_hash": content_hash,
+            "file_size": file_size,
+            "filename": name,
+            "params": params,
+        })
+
+    # Entries left over name files that were not uploaded
+    rejected += [{"filename": name, "error": "Listed in the manifest but not uploaded"} for name in manifest]
+    return uploads, rejected
@@ -0,0 +1,160 @@
+# app/course_payloads.py
+"""
+Pre-rendered student view of a course, served as raw bytes.
+
+GET /courses/{id} returns the course's title, description and questions
+without their correct answers. Rather than loading, validating and
+re-encoding the questions on every request, the payload is rendered once
+into compact JSON and a gzip copy, stored in the ``course_payloads``
+collection and kept in a small per-process cache, so a request costs the
+course lookup and payment check plus a write of bytes.
+
+Payloads are stamped with the course's ``answers_version`` (see
+app/answer_keys.py), which every write to a course's questions changes.
+Writers that have the questions in hand render the new payload straight
+away with payload_document(); a request that finds no payload for the
+current version renders and stores one itself.
+
+Configured through the environment:
+    COURSE_PAYLOAD_CACHE_COURSES  payloads kept per process (default: 64)
+"""
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from bson import Binary
+from pymongo import ReplaceOne
+
+from app import metrics
+from app.answer_keys import VERSION_FIELD
+from app.question_store import find_questions
+from app.single_flight import SingleFlight
+
+CACHE_COURSES = int(os.environ.get("COURSE_PAYLOAD_CACHE_COURSES", 64))
+# Larger payloads are only cached in process, to stay clear of the 16 MB
+# document limit
+MAX_STORED_BYTES = 12 * 1024 * 1024
+GZIP_LEVEL = 6
+
+STUDENT_FIELDS = ["id", "question_text", "options"]
+
+
+class Payload(NamedTuple):
+    version: str
+    body: bytes
+    gzipped: bytes
+
+
+def render(course: Dict[str, Any], questions: Iterable[Dict[str, Any]]) -> Payload:
+    """Encode the student view of a course the way FastAPI's JSONResponse would"""
+    view = {
+        "id": course["id"],
+        "title": course["title"],
+        "description": course["description"],
+        "total_questions": course["total_questions"],
+        "questions": [{field: question[field] for field in STUDENT_FIELDS} for question in questions],
+    }
+    body = json.dumps(view, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return Payload(course.get(VERSION_FIELD, ""), body, gzip.compress(body, GZIP_LEVEL, mtime=0))
+
+
+def payload_document(course: Dict[str, Any], questions: Iterable[Dict[str, Any]]) -> Optional[ReplaceOne]:
+    """Write that stores the rendered payload of a course, or None if it is too large
+
+    Works with pymongo and Motor bulk_write; ``course`` is a course document
+    or Course.dict() and ``questions`` its questions in order.
+    """
+    payload = render(course, (q.dict() if hasattr(q, "dict") else q for q in questions))
+    return _replace(course["id"], payload)
+
+
+def _replace(course_id: str, payload: Payload) -> Optional[ReplaceOne]:
+    if len(payload.body) + len(payload.gzipped) > MAX_STORED_BYTES:
+        return None
+    return ReplaceOne(
+        {"course_id": course_id},
+        {
+            "course_id": course_id,
+            "version": payload.version,
+            "body": Binary(payload.body),
+            "gzipped": Binary(payload.gzipped),
+            "rendered_at": datetime.utcnow(),
+        },
+        upsert=True,
+    )
+
+
+_lock = threading.Lock()
+_payloads: "OrderedDict[str, Payload]" = OrderedDict()
+_loads = SingleFlight("course_payload")
+
+
+def cached(course_id: str, version: str) -> Optional[Payload]:
+    with _lock:
+        payload = _payloads.get(course_id)
+        if payload is None or payload.version != version:
+            return None
+        _payloads.move_to_end(course_id)
+        return payload
+
+
+def remember(course_id: str, payload: Payload):
+    with _lock:
+        _payloads[course_id] = payload
+        _payloads.move_to_end(course_id)
+        while len(_payloads) > CACHE_COURSES:
+            _payloads.popitem(last=False)
+
+
+def invalidate(course_id: str):
+    with _lock:
+        _payloads.pop(course_id, None)
+
+
+def clear():
+    with _lock:
+        _payloads.clear()
+
+
+async def get_payload(db, course_id: str, version: str) -> Optional[Payload]:
+    """The student payload of a course at ``version``; None if the course is gone"""
+    payload = cached(course_id, version)
+    if payload is not None:
+        metrics.inc("course_payload", source="memory")
+        return payload
+    return await _loads.do((course_id, version), lambda: _load(db, course_id, version))
+
+
+async def _load(db, course_id: str, version: str) -> Optional[Payload]:
+    stored = await db.course_payloads.find_one({"course_id": course_id, "version": version}, {"_id": 0})
+    if stored:
+        metrics.inc("course_payload", source="stored")
+        payload = Payload(version, bytes(stored["body"]), bytes(stored["gzipped"]))
+        remember(course_id, payload)
+        return payload
+
+    metrics.inc("course_payload", source="rendered")
+    return await refresh(db, course_id)
+
+
+async def refresh(db, course_id: str) -> Optional[Payload]:
+    """Render and store the payload of a course from its current questions"""
+    # The version is read before the questions, so a concurrent edit can only
+    # make the stored payload newer than its version, never older
+    course = await db.courses.find_one(
+        {"id": course_id}, {"_id": 0, "id": 1, "title": 1, "description": 1, "total_questions": 1, VERSION_FIELD: 1}
+    )
+    if not course:
+        invalidate(course_id)
+        return None
+    questions = await find_questions(db, course_id, STUDENT_FIELDS).to_list(None)
+    payload = render(course, questions)
+    remember(course_id, payload)
+    operation = _replace(course_id, payload)
+    if operation is not None:
+        await db.course_payloads.bulk_write([operation])
+    return payload
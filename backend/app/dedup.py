@@ -0,0 +1,166 @@
+# app/dedup.py
+"""
+Near-duplicate question detection.
+
+Each question is reduced to a set of shingles (word 3-grams of its
+normalised stem) and a MinHash signature of that set. Signatures are split
+into LSH bands, so a lookup only compares the question against entries that
+share a band, and candidates are confirmed by the exact Jaccard similarity of
+their shingle sets. Adding n questions therefore costs roughly O(n) rather
+than O(n^2) comparisons.
+
+Options are scored separately: a candidate must also share at least half of
+its normalised options. Two questions that share a long stem but offer
+different answers stay distinct however long the stem is, while the same
+question with a missing option, different numbering or a trailing
+"Select one:" does not.
+"""
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.models import Question
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.7
+OPTION_THRESHOLD = 0.5
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 31) - 1
+# Fixed seed: signatures must agree between processes and restarts
+_rng = np.random.default_rng(104)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_NUMBER_PREFIX = re.compile(r'^\s*(?:q(?:uestion)?\s*)?\d+\s*[.):]?\s+', re.IGNORECASE)
+_SELECT_ONE = re.compile(r'\bselect one\b:?', re.IGNORECASE)
+_NON_WORD = re.compile(r'[\W_]+')
+_NOISE = re.compile(r'https?://|\bselect one\b|\bmark \d|\d+/\d+/\d+|^\s*(?:q(?:uestion)?\s*)?\d+\s*[.):]', re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words only, without question numbering or 'Select one:'"""
+    text = _NUMBER_PREFIX.sub('', text)
+    text = _SELECT_ONE.sub(' ', text)
+    return _NON_WORD.sub(' ', text).lower().strip()
+
+
+def shingle_set(question_text: str) -> Set[int]:
+    words = normalize_text(question_text).split()
+    if len(words) < SHINGLE_WORDS:
+        grams = [' '.join(words)]
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {zlib.crc32(gram.encode('utf-8')) for gram in grams}
+
+
+def option_set(options: Iterable[str]) -> Set[str]:
+    return {normalize_text(option) for option in options}
+
+
+def minhash(shingles: Set[int]) -> np.ndarray:
+    values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    hashed = (np.outer(_A, values) + _B[:, None]) % _PRIME
+    return hashed.min(axis=1)
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def question_quality(question: Question) -> Tuple[int, int]:
+    """Higher is better: more options first, then fewer noise markers"""
+    return min(len(question.options), 4), -len(_NOISE.findall(question.question_text))
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of questions, usable for one upload or a whole bank"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, bytes], List[Hashable]] = defaultdict(list)
+        self._shingles: Dict[Hashable, Set[int]] = {}
+        self._options: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def find(self, question_text: str, options: Iterable[str]) -> Optional[Hashable]:
+        """Key of the most similar indexed question at or above the threshold"""
+        return self._find(shingle_set(question_text), option_set(options))[0]
+
+    def add(self, key: Hashable, question_text: str, options: Iterable[str]) -> Optional[Hashable]:
+        """Index a question unless it near-duplicates one already indexed
+
+        Returns the key of that existing question, or None if the question
+        was new and has been indexed under ``key``.
+        """
+        shingles, choices = shingle_set(question_text), option_set(options)
+        match, bands = self._find(shingles, choices)
+        if match is not None:
+            return match
+        self._shingles[key] = shingles
+        self._options[key] = choices
+        for band in bands:
+            self._buckets[band].append(key)
+        return None
+
+    def _find(self, shingles: Set[int], choices: Set[str]) -> Tuple[Optional[Hashable], List[Tuple[int, bytes]]]:
+        signature = minhash(shingles)
+        bands = [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+        candidates = {key for band in bands for key in self._buckets.get(band, ())}
+
+        best, best_score = None, self.threshold
+        for key in candidates:
+            if jaccard(choices, self._options[key]) < OPTION_THRESHOLD:
+                continue
+            score = jaccard(shingles, self._shingles[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best, bands
+
+
+def remove_near_duplicates(questions: List[Question]) -> List[Question]:
+    """Collapse near-duplicate questions, keeping the best-formed of each group
+
+    The surviving question takes the position of the first one seen in its
+    group, so document order is preserved.
+    """
+    index = NearDuplicateIndex()
+    kept: List[Question] = []
+    position: Dict[int, int] = {}
+
+    for i, question in enumerate(questions):
+        match = index.add(i, question.question_text, question.options)
+        if match is None:
+            position[i] = len(kept)
+            kept.append(question)
+            continue
+        slot = position[match]
+        if question_quality(question) > question_quality(kept[slot]):
+            kept[slot] = question
+
+    return kept
+
+
+def find_duplicate_clusters(entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group near-duplicate questions across a course bank
+
+    ``entries`` are dicts with at least ``question_text`` and ``options``; the
+    returned clusters hold the entries of every group with two or more members.
+    """
+    index = NearDuplicateIndex()
+    clusters: Dict[int, List[Dict[str, Any]]] = {}
+
+    for i, entry in enumerate(entries):
+        match = index.add(i, entry["question_text"], entry["options"])
+        clusters.setdefault(i if match is None else match, []).append(entry)
+
+    return [members for members in clusters.values() if len(members) > 1]
@@ -0,0 +1,113 @@
+# app/grading.py
+"""
+Vectorized grading of stored test attempts, for regrading a whole course.
+
+When an admin corrects an answer, the scores of attempts already taken are
+stale. regrade_course() reads the course's attempts in chunks, lays each
+chunk out as an (attempts x questions) int32 matrix of selected options,
+compares the matrix with the answer-key vector in one NumPy operation and
+writes back, with bulk_write, the scores that changed. Scores are computed
+exactly as submit_test_attempt computes them, so an attempt that was graded
+against the current key is left untouched.
+
+Regrades run as ``course_regrade`` jobs of the ingestion worker (see
+app/ingestion_jobs.py), queued by question edits that change an answer.
+
+Configured through the environment:
+    REGRADE_CHUNK_ATTEMPTS  attempts scored per matrix and bulk_write (default: 2000)
+"""
+import logging
+import os
+from itertools import chain, repeat
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+from app.answer_keys import AnswerKey
+from app.question_store import find_questions
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ATTEMPTS = int(os.environ.get("REGRADE_CHUNK_ATTEMPTS", 2000))
+
+# Cell value of a question the attempt did not answer; submissions can never
+# select it, since it is excluded from the accepted range below
+UNANSWERED = np.iinfo(np.int32).min
+_MAX_OPTION = np.iinfo(np.int32).max
+
+
+def selection_matrix(attempt_answers: List[Dict[str, int]], key: AnswerKey) -> np.ndarray:
+    """Selected option per attempt (rows) and question (columns, in key order)
+
+    Answers to questions no longer in the course, and selections that no
+    int32 answer could equal, are dropped. Every answer is flattened into
+    NumPy arrays with C-level iteration, so no Python code runs per answer.
+    """
+    matrix = np.full((len(attempt_answers), len(key)), UNANSWERED, dtype=np.int32)
+    counts = np.fromiter(map(len, attempt_answers), dtype=np.int64, count=len(attempt_answers))
+    total = int(counts.sum())
+    rows = np.repeat(np.arange(len(attempt_answers)), counts)
+    columns = np.fromiter(
+        map(key.positions.get, chain.from_iterable(attempt_answers), repeat(-1)), dtype=np.int64, count=total
+    )
+    values = chain.from_iterable(answers.values() for answers in attempt_answers)
+    try:
+        selected = np.fromiter(values, dtype=np.int64, count=total)
+    except OverflowError:
+        # A selection beyond int64 can match nothing; clamp them all the slow way
+        selected = np.fromiter(
+            (min(max(value, UNANSWERED), _MAX_OPTION + 1) for answers in attempt_answers for value in answers.values()),
+            dtype=np.int64, count=total,
+        )
+    keep = (columns >= 0) & (selected > UNANSWERED) & (selected <= _MAX_OPTION)
+    if keep.all():
+        matrix[rows, columns] = selected
+    else:
+        matrix[rows[keep], columns[keep]] = selected[keep]
+    return matrix
+
+
+def score_matrix(matrix: np.ndarray, key: AnswerKey) -> Tuple[np.ndarray, np.ndarray]:
+    """Correct answers and percentage score of every row"""
+    correct = np.count_nonzero(matrix == np.frombuffer(key.answers, dtype=np.intc), axis=1)
+    if not len(key):
+        return correct, np.zeros(len(matrix))
+    # Same operations, in the same order, as grading a single attempt
+    return correct, (correct / len(key)) * 100
+
+
+def _regrade_chunk(db, attempts: List[Dict[str, Any]], key: AnswerKey) -> int:
+    _, scores = score_matrix(selection_matrix([attempt["answers"] for attempt in attempts], key), key)
+    total = len(key)
+    operations = [
+        UpdateOne({"id": attempt["id"]}, {"$set": {"score": float(score), "total_questions": total}})
+        for attempt, score in zip(attempts, scores.tolist())
+        if attempt["score"] != score or attempt["total_questions"] != total
+    ]
+    if operations:
+        db.test_attempts.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def regrade_course(db, course_id: str) -> Dict[str, int]:
+    """Rescore every stored attempt at a course against its current answers
+
+    ``db`` is a pymongo database; returns how many attempts were read and
+    how many had their score changed.
+    """
+    key = AnswerKey.from_questions("", find_questions(db, course_id, ["id", "correct_answer"]))
+    cursor = db.test_attempts.find(
+        {"course_id": course_id}, {"_id": 0, "id": 1, "answers": 1, "score": 1, "total_questions": 1}
+    ).batch_size(CHUNK_ATTEMPTS)
+    read = rescored = 0
+    chunk: List[Dict[str, Any]] = []
+    for attempt in cursor:
+        chunk.append(attempt)
+        if len(chunk) >= CHUNK_ATTEMPTS:
+            read, rescored = read + len(chunk), rescored + _regrade_chunk(db, chunk, key)
+            chunk = []
+    if chunk:
+        read, rescored = read + len(chunk), rescored + _regrade_chunk(db, chunk, key)
+    logger.info("Regraded course %s: %d attempts read, %d rescored", course_id, read, rescored)
+    return {"attempts": read, "rescored": rescored}
@@ -0,0 +1,241 @@
+# app/indexes.py
+"""
+Every MongoDB index the application relies on, declared in one place.
+
+ensure_indexes() runs in the background when the API starts, so an
+unreachable server is logged rather than keeping the API down. It creates the declared indexes
+that are missing, which is safe to repeat, and reports drift: declared
+indexes that could not be created (duplicate values under a unique index,
+say), indexes whose options differ from the declaration, and indexes on our
+collections that nobody declared. Drift is logged and served from
+GET /admin/indexes but never repaired automatically; dropping or rebuilding
+an index on a live collection is an operator's decision.
+
+HOT_QUERIES lists the filtered queries the API and the ingestion worker run,
+with placeholder values. find_collscans() explains each of them and reports
+any the server would answer with a collection scan. Add a query here with
+every new route that looks documents up, and an index to INDEXES if it needs
+one.
+
+    cd backend && python -m app.indexes           # report drift and collection scans
+    cd backend && python -m app.indexes --create  # create missing indexes first
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.parse_cache import CACHE_TTL_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Options compared when looking for drift; anything else (name, version,
+# background) may differ freely
+COMPARED_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression", "sparse")
+
+
+class Index(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    options: Dict[str, Any] = {}
+
+    def describe(self) -> str:
+        return f"{self.collection} {_key_text(self.keys)}"
+
+
+class HotQuery(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[Dict[str, int]] = None
+
+
+def _key_text(keys) -> str:
+    return "{" + ", ".join(f"{field}: {direction}" for field, direction in keys) + "}"
+
+
+INDEXES: List[Index] = [
+    Index("users", (("id", ASCENDING),), {"unique": True}),
+    Index("users", (("email", ASCENDING),), {"unique": True}),
+    Index("courses", (("id", ASCENDING),), {"unique": True}),
+    Index("questions", (("course_id", ASCENDING), ("id", ASCENDING)), {"unique": True}),
+    Index("questions", (("course_id", ASCENDING), ("ordinal", ASCENDING))),
+    Index("course_payloads", (("course_id", ASCENDING),), {"unique": True}),
+    Index("payments", (("user_id", ASCENDING), ("course_id", ASCENDING), ("status", ASCENDING))),
+    Index("payments", (("course_id", ASCENDING), ("status", ASCENDING))),
+    # Payments start without a reference, so only set ones must be unique
+    Index("payments", (("paystack_reference", ASCENDING),),
+          {"unique": True, "partialFilterExpression": {"paystack_reference": {"$gt": ""}}}),
+    Index("test_attempts", (("user_id", ASCENDING), ("course_id", ASCENDING))),
+    Index("test_attempts", (("course_id", ASCENDING),)),
+    Index("test_attempts", (("id", ASCENDING),), {"unique": True}),
+    Index("ingestion_jobs", (("id", ASCENDING),), {"unique": True}),
+    Index("ingestion_jobs", (("state", ASCENDING), ("created_at", ASCENDING))),
+    Index("ingestion_jobs", (("state", ASCENDING), ("finished_at", DESCENDING))),
+    Index("ingestion_jobs", (("batch_id", ASCENDING),)),
+    Index("ingestion_batches", (("id", ASCENDING),), {"unique": True}),
+    Index("ingestion_batches", (("state", ASCENDING),)),
+    Index("parsed_pdfs", (("content_hash", ASCENDING), ("parser_version", ASCENDING)), {"unique": True}),
+    Index("parsed_pdfs", (("last_used_at", ASCENDING),), {"expireAfterSeconds": CACHE_TTL_DAYS * 24 * 3600}),
+    Index("pdf_pages", (("content_hash", ASCENDING), ("page", ASCENDING)), {"unique": True}),
+]
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("current user", "users", {"id": "user"}),
+    HotQuery("login and registration", "users", {"email": "user@example.com"}),
+    HotQuery("course by id", "courses", {"id": "course"}),
+    HotQuery("course questions", "questions", {"course_id": "course"}, {"ordinal": 1}),
+    HotQuery("question edit", "questions", {"course_id": "course", "id": "question"}),
+    HotQuery("student course payload", "course_payloads", {"course_id": "course", "version": "version"}),
+    HotQuery("questions of several courses", "questions", {"course_id": {"$in": ["course"]}},
+             {"course_id": 1, "ordinal": 1}),
+    HotQuery("course access", "payments", {"user_id": "user", "course_id": "course", "status": "completed"}),
+    HotQuery("payment verification", "payments", {"paystack_reference": "reference"}),
+    HotQuery("course statistics", "payments", {"course_id": "course", "status": "completed"}),
+    HotQuery("course deletion", "payments", {"course_id": "course"}),
+    HotQuery("attempt check", "test_attempts", {"user_id": "user", "course_id": "course"}),
+    HotQuery("my attempts", "test_attempts", {"user_id": "user"}),
+    HotQuery("course attempts", "test_attempts", {"course_id": "course"}),
+    HotQuery("regrade writes", "test_attempts", {"id": "attempt"}),
+    HotQuery("job status", "ingestion_jobs", {"id": "job"}),
+    HotQuery("job claim", "ingestion_jobs", {"$or": [
+        {"state": "queued"},
+        {"state": "running", "lease_expires_at": {"$lt": datetime(2000, 1, 1)},
+         "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+    ]}, {"created_at": 1}),
+    HotQuery("batch jobs", "ingestion_jobs", {"batch_id": "batch"}),
+    HotQuery("queued regrade", "ingestion_jobs", {"kind": "course_regrade", "course_id": "course", "state": "queued"}),
+    HotQuery("parse metrics", "ingestion_jobs", {"state": "completed", "metrics.methods": {"$exists": True}},
+             {"finished_at": -1}),
+    HotQuery("batch status", "ingestion_batches", {"id": "batch"}),
+    HotQuery("stalled batches", "ingestion_batches", {"$or": [
+        {"state": "processing"},
+        {"state": "writing", "lease_expires_at": {"$lt": datetime(2000, 1, 1)}},
+    ]}),
+    HotQuery("parse cache", "parsed_pdfs", {"content_hash": "hash", "parser_version": 1}),
+    HotQuery("stored pages", "pdf_pages", {"content_hash": "hash"}, {"page": 1}),
+]
+
+
+def _compared(options: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: options[name] for name in COMPARED_OPTIONS if options.get(name) not in (None, False)}
+
+
+async def _existing_indexes(db, collection: str) -> Dict[Tuple[Tuple[str, int], ...], Dict[str, Any]]:
+    try:
+        information = await db[collection].index_information()
+    except OperationFailure:
+        return {}  # the collection does not exist yet
+    return {
+        tuple((field, int(direction)) for field, direction in info["key"]): {"name": name, **info}
+        for name, info in information.items()
+        if name != "_id_"
+    }
+
+
+async def index_drift(db) -> Dict[str, List[str]]:
+    """Declared indexes that are missing or differ, and undeclared ones"""
+    drift: Dict[str, List[str]] = {"missing": [], "conflicting": [], "undeclared": []}
+    for collection in sorted({index.collection for index in INDEXES}):
+        existing = await _existing_indexes(db, collection)
+        declared = {index.keys: index for index in INDEXES if index.collection == collection}
+        for keys, index in declared.items():
+            info = existing.get(keys)
+            if info is None:
+                drift["missing"].append(index.describe())
+            elif _compared(info) != _compared(index.options):
+                drift["conflicting"].append(
+                    f"{index.describe()}: has {_compared(info)}, declared {_compared(index.options)}"
+                )
+        drift["undeclared"] += [
+            f"{collection} {_key_text(keys)} ({info['name']})" for keys, info in existing.items() if keys not in declared
+        ]
+    return drift
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create missing indexes and report drift; never drops or rebuilds one"""
+    created, failed = [], []
+    for index in INDEXES:
+        existing = await _existing_indexes(db, index.collection)
+        if index.keys in existing:
+            continue
+        try:
+            await db[index.collection].create_index(list(index.keys), **index.options)
+            created.append(index.describe())
+        except OperationFailure as e:
+            failed.append(f"{index.describe()}: {e}")
+
+    report = await index_drift(db)
+    report.update(created=created, failed=failed)
+    if created:
+        logger.info("Created indexes: %s", "; ".join(created))
+    for kind in ("failed", "conflicting", "undeclared"):
+        if report[kind]:
+            logger.warning("Index drift, %s: %s", kind, "; ".join(report[kind]))
+    return report
+
+
+def _has_collscan(plan: Any) -> bool:
+    if isinstance(plan, dict):
+        return plan.get("stage") == "COLLSCAN" or any(_has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(value) for value in plan)
+    return False
+
+
+async def find_collscans(db) -> List[str]:
+    """HOT_QUERIES whose winning plan scans the whole collection"""
+    scans = []
+    for query in HOT_QUERIES:
+        find: Dict[str, Any] = {"find": query.collection, "filter": query.filter}
+        if query.sort:
+            find["sort"] = query.sort
+        explained = await db.command({"explain": find, "verbosity": "queryPlanner"})
+        if _has_collscan(explained["queryPlanner"]["winningPlan"]):
+            scans.append(f"{query.name}: {query.collection} {query.filter}")
+    return scans
+
+
+def unindexed_queries() -> List[str]:
+    """HOT_QUERIES with no declared index led by one of their equality fields
+
+    A static check that needs no server; find_collscans() is the real one.
+    """
+    leading = {(index.collection, index.keys[0][0]) for index in INDEXES}
+    unindexed = []
+    for query in HOT_QUERIES:
+        branches = query.filter.get("$or", [query.filter])
+        if not all(any((query.collection, field) in leading for field in branch) for branch in branches):
+            unindexed.append(f"{query.name}: {query.collection} {query.filter}")
+    return unindexed
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+    import os
+    import sys
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Report MongoDB index drift and collection scans")
+    parser.add_argument("--create", action="store_true", help="create missing indexes first")
+    args = parser.parse_args()
+
+    async def check() -> bool:
+        load_dotenv(Path(__file__).parent.parent / ".env")
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        db = client[os.environ["DB_NAME"]]
+        report = await ensure_indexes(db) if args.create else await index_drift(db)
+        report["collscans"] = await find_collscans(db)
+        client.close()
+        print(json.dumps(report, indent=2))
+        return not any(report[kind] for kind in ("missing", "conflicting", "failed", "collscans") if kind in report)
+
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -0,0 +1,714 @@
+# app/ingestion_jobs.py
+"""
+Durable background ingestion jobs for course PDF uploads.
+
+An upload stores the PDF in GridFS and inserts a queued document into the
+``ingestion_jobs`` collection, then returns straight away. A worker loop
+(started with the API, or on its own with ``python -m app.ingestion_jobs``)
+claims queued jobs atomically and hands each one to a parse pool process,
+which parses the PDF, inserts the course and its questions (see
+app/question_store.py) and reports page progress back to the job document.
+
+A re-import job parses a new PDF for an existing course and applies only the
+differences to its questions (see app/reimport.py), keeping question ids,
+admin-set answers and test attempts. A regrade job has no PDF; it rescores
+the stored attempts at a course after its answers changed (see
+app/grading.py).
+
+Files of a bulk upload are queued together as one batch and parsed like any
+other job, but their courses are held on the job documents until the last
+job of the batch has finished, then written in one bulk write. The write
+holds a lease on the batch like a running job; if its process dies, the
+worker loop's sweep writes the batch again, and it also finishes batches
+whose last job ended without finishing them.
+
+A running job holds a lease, which the worker loop renews while the job waits
+for and runs in the parse pool. If the process running it dies, the lease
+runs out and another worker loop claims the job again, up to
+``max_attempts`` times; a job whose lease runs out on its last attempt is
+marked failed by the next sweep of a worker loop. The course id is fixed when the job is created and the course is
+upserted, so a retried job never creates a second course.
+
+Uploads are streamed into GridFS chunk by chunk and hashed on the way, and
+the worker downloads them to a temporary file that the parser memory-maps,
+so no process holds a whole PDF in memory.
+
+Configured through the environment:
+    INGESTION_WORKER_ENABLED  run the worker loop inside the API (default: 1)
+    INGESTION_POLL_INTERVAL   seconds between polls when idle (default: 2)
+    INGESTION_MAX_ATTEMPTS    attempts before a job is marked failed (default: 3)
+    PDF_MAX_UPLOAD_MB         largest PDF accepted for upload (default: 50)
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import gridfs
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import MongoClient, ReplaceOne, ReturnDocument
+
+from app import (
+    answer_keys, course_payloads, grading, metrics, page_store, parse_cache, parse_pool, preflight, question_store,
+    reimport,
+)
+from app.limits import MemoryWatch, ResourceLimitExceeded
+from app.models import Course, IngestionBatch, IngestionJob
+from app.pdf_parser import PARSER_VERSION, extract_and_parse
+
+logger = logging.getLogger(__name__)
+
+WORKER_ENABLED = os.environ.get("INGESTION_WORKER_ENABLED", "1") == "1"
+POLL_INTERVAL = float(os.environ.get("INGESTION_POLL_INTERVAL", 2))
+MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", 3))
+# A job is never reclaimed while it can still legitimately be running.
+LEASE_SECONDS = parse_pool.PARSE_TIMEOUT + 30
+LEASE_RENEW_INTERVAL = LEASE_SECONDS / 3
+BATCH_WRITE_LEASE_SECONDS = 300
+SWEEP_INTERVAL = 30
+PROGRESS_INTERVAL = 1.0
+UPLOAD_BUCKET = "ingestion_uploads"
+MAX_UPLOAD_BYTES = int(float(os.environ.get("PDF_MAX_UPLOAD_MB", 50)) * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = 256 * 1024
+KIND_UPLOAD = "course_upload"
+KIND_REIMPORT = "course_reimport"
+KIND_REGRADE = "course_regrade"
+
+# Result fields of process_job stored on the finished job
+RESULT_FIELDS = (
+    "course_id", "questions_extracted", "from_cache", "extraction_backend", "pages_without_text",
+    "changes", "peak_rss_mb", "metrics",
+)
+# Fields never returned by the job status endpoint
+PRIVATE_FIELDS = {"_id": 0, "file_id": 0, "lease_expires_at": 0, "course": 0}
+# Terminal job states
+FINISHED_STATES = ("completed", "failed")
+
+_wakeup: Optional[asyncio.Event] = None
+_sync_db = None
+
+
+class IngestionError(Exception):
+    """A job failure that retrying will not fix, e.g. a PDF with no questions."""
+
+
+class UploadTooLarge(Exception):
+    """The uploaded file is bigger than PDF_MAX_UPLOAD_MB."""
+
+
+def _get_wakeup() -> asyncio.Event:
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    return _wakeup
+
+
+# API side
+
+async def store_upload(db, upload, filename: str = "") -> Tuple[str, str, int]:
+    """Stream an uploaded file into GridFS, hashing it on the way
+
+    ``upload`` is anything with an async ``read(size)``, such as FastAPI's
+    UploadFile. Returns (file_id, sha256 hex digest, size in bytes).
+    """
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=UPLOAD_BUCKET)
+    grid_in = bucket.open_upload_stream(filename or "upload.pdf")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"PDF is larger than the {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB upload limit")
+            digest.update(chunk)
+            await grid_in.write(chunk)
+    except BaseException:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    return str(grid_in._id), digest.hexdigest(), size
+
+
+async def enqueue_course_upload(
+    db,
+    file_id: str,
+    content_hash: str,
+    filename: str,
+    params: Dict[str, Any],
+    created_by: str,
+    file_size: int = 0,
+) -> IngestionJob:
+    """Queue a job that turns a stored upload into a course."""
+    job = IngestionJob(
+        created_by=created_by,
+        params=params,
+        filename=filename or "",
+        file_id=file_id,
+        file_size=file_size,
+        content_hash=content_hash,
+        max_attempts=MAX_ATTEMPTS,
+    )
+    await db.ingestion_jobs.insert_one(job.dict())
+    _get_wakeup().set()
+    return job
+
+
+async def enqueue_course_reimport(
+    db,
+    course_id: str,
+    file_id: str,
+    content_hash: str,
+    filename: str,
+    created_by: str,
+    file_size: int = 0,
+) -> IngestionJob:
+    """Queue a job that re-imports a stored upload into an existing course."""
+    job = IngestionJob(
+        kind=KIND_REIMPORT,
+        course_id=course_id,
+        created_by=created_by,
+        filename=filename or "",
+        file_id=file_id,
+        file_size=file_size,
+        content_hash=content_hash,
+        max_attempts=MAX_ATTEMPTS,
+    )
+    await db.ingestion_jobs.insert_one(job.dict())
+    _get_wakeup().set()
+    return job
+
+
+async def enqueue_course_regrade(db, course_id: str, created_by: str) -> dict:
+    """Queue a regrade of a course's attempts, unless one is already queued
+
+    A queued regrade reads the answers when it runs, so several edits in a row
+    need only one. Returns the queued job's public fields.
+    """
+    job = IngestionJob(kind=KIND_REGRADE, course_id=course_id, created_by=created_by, max_attempts=MAX_ATTEMPTS)
+    queued = await db.ingestion_jobs.find_one_and_update(
+        {"kind": KIND_REGRADE, "course_id": course_id, "state": "queued"},
+        {"$setOnInsert": job.dict()},
+        projection=PRIVATE_FIELDS,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _get_wakeup().set()
+    return queued
+
+
+async def enqueue_course_batch(
+    db,
+    uploads: List[Dict[str, Any]],
+    rejected: List[Dict[str, str]],
+    created_by: str,
+) -> Tuple[IngestionBatch, List[IngestionJob]]:
+    """Queue a job per stored upload of a bulk upload, as one batch
+
+    ``uploads`` hold the file_id, content_hash, file_size, filename and params
+    of each stored file; ``rejected`` lists files refused before storage.
+    """
+    batch = IngestionBatch(created_by=created_by, rejected=rejected)
+    jobs = [
+        IngestionJob(created_by=created_by, batch_id=batch.id, max_attempts=MAX_ATTEMPTS, **upload)
+        for upload in uploads
+    ]
+    batch.job_ids = [job.id for job in jobs]
+    if not jobs:
+        batch.state = "completed"
+        batch.finished_at = batch.created_at
+    await db.ingestion_batches.insert_one(batch.dict())
+    if jobs:
+        await db.ingestion_jobs.insert_many([job.dict() for job in jobs])
+        _get_wakeup().set()
+    return batch, jobs
+
+
+async def get_job(db, job_id: str) -> Optional[dict]:
+    return await db.ingestion_jobs.find_one({"id": job_id}, PRIVATE_FIELDS)
+
+
+async def get_batch(db, batch_id: str) -> Optional[dict]:
+    """A batch with the outcome of each of its files"""
+    batch = await db.ingestion_batches.find_one({"id": batch_id}, {"_id": 0})
+    if not batch:
+        return None
+    jobs = await db.ingestion_jobs.find(
+        {"batch_id": batch_id},
+        {"_id": 0, "id": 1, "filename": 1, "params.title": 1, "state": 1, "course_id": 1,
+         "questions_extracted": 1, "pages_without_text": 1, "errors": 1},
+    ).to_list(None)
+    states = [job["state"] for job in jobs]
+    batch["summary"] = {
+        "files": len(jobs) + len(batch["rejected"]),
+        "queued": states.count("queued"),
+        "running": states.count("running"),
+        "completed": states.count("completed"),
+        "failed": states.count("failed"),
+        "rejected": len(batch["rejected"]),
+    }
+    batch["files"] = [
+        {
+            "filename": job["filename"],
+            "title": job["params"]["title"],
+            "job_id": job["id"],
+            "state": job["state"],
+            "course_id": job["course_id"] if job["state"] == "completed" else None,
+            "questions_extracted": job["questions_extracted"],
+            "pages_without_text": job.get("pages_without_text", []),
+            "error": job["errors"][-1] if job["state"] == "failed" and job["errors"] else None,
+        }
+        for job in jobs
+    ] + [
+        {"filename": entry["filename"], "state": "rejected", "error": entry["error"]}
+        for entry in batch["rejected"]
+    ]
+    return batch
+
+
+async def claim_next_job(db) -> Optional[dict]:
+    """Atomically take the oldest queued job, or a running job whose lease ran out.
+
+    A job whose lease ran out on its last attempt is left to fail_abandoned_jobs().
+    """
+    now = datetime.utcnow()
+    return await db.ingestion_jobs.find_one_and_update(
+        {
+            "$or": [
+                {"state": "queued"},
+                {
+                    "state": "running",
+                    "lease_expires_at": {"$lt": now},
+                    "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                },
+            ]
+        },
+        {
+            "$set": {
+                "state": "running",
+                "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def fail_abandoned_jobs(db) -> int:
+    """Mark failed the running jobs whose lease ran out on their last attempt"""
+    failed = 0
+    while True:
+        now = datetime.utcnow()
+        job = await db.ingestion_jobs.find_one_and_update(
+            {
+                "state": "running",
+                "lease_expires_at": {"$lt": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {
+                "$set": {"state": "failed", "lease_expires_at": None, "updated_at": now, "finished_at": now},
+                "$push": {"errors": "last attempt: the process running the job stopped"},
+            },
+        )
+        if job is None:
+            return failed
+        failed += 1
+        logger.warning("Ingestion job %s was abandoned on its last attempt", job["id"])
+        await _delete_upload(db, job)
+        if job.get("batch_id"):
+            await _finish_batch_if_done(db, job["batch_id"])
+
+
+async def _renew_lease(db, job: dict):
+    """Extend a job's lease until cancelled, unless another worker has reclaimed it"""
+    while True:
+        await asyncio.sleep(LEASE_RENEW_INTERVAL)
+        try:
+            await db.ingestion_jobs.update_one(
+                {"id": job["id"], "state": "running", "attempts": job["attempts"]},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)}},
+            )
+        except Exception:
+            logger.exception("Could not renew the lease of ingestion job %s", job["id"])
+
+
+async def _finish_job(db, job: dict, result: Dict[str, Any]):
+    now = datetime.utcnow()
+    update = {"course": result["course"]} if job.get("batch_id") else {}
+    await db.ingestion_jobs.update_one(
+        {"id": job["id"]},
+        {"$set": {
+            **update,
+            **{field: result[field] for field in RESULT_FIELDS if field in result},
+            "state": "completed",
+            "lease_expires_at": None,
+            "updated_at": now,
+            "finished_at": now,
+        }},
+    )
+    await _delete_upload(db, job)
+    if "metrics" in result:
+        metrics.record_parse(result["metrics"])
+
+
+async def _fail_job(db, job: dict, error: str, retry: bool):
+    now = datetime.utcnow()
+    retry = retry and job["attempts"] < job["max_attempts"]
+    update = {
+        "state": "queued" if retry else "failed",
+        "lease_expires_at": None,
+        "updated_at": now,
+    }
+    if not retry:
+        update["finished_at"] = now
+    await db.ingestion_jobs.update_one(
+        {"id": job["id"]},
+        {"$set": update, "$push": {"errors": f"attempt {job['attempts']}: {error}"}},
+    )
+    if not retry:
+        await _delete_upload(db, job)
+
+
+async def _delete_upload(db, job: dict):
+    if not job.get("file_id"):
+        return
+    try:
+        await AsyncIOMotorGridFSBucket(db, bucket_name=UPLOAD_BUCKET).delete(ObjectId(job["file_id"]))
+    except gridfs.errors.NoFile:
+        pass
+
+
+async def run_job(db, job: dict):
+    """Run one claimed job in the parse pool and record how it ended."""
+    # The job may wait for a parse pool slot held by other jobs or API requests
+    lease = asyncio.create_task(_renew_lease(db, job))
+    try:
+        result = await parse_pool.run_in_pool(process_job, job["id"])
+    except (IngestionError, ResourceLimitExceeded) as e:
+        await _fail_job(db, job, str(e), retry=False)
+    except parse_pool.ParseTimeout as e:
+        await _fail_job(db, job, str(e), retry=True)
+    except parse_pool.WorkerCrashed as e:
+        # Every job running in the pool fails when one worker dies, so retry;
+        # a PDF that kills each worker it runs in uses up its attempts
+        logger.warning("Ingestion job %s lost its worker: %s", job["id"], e)
+        await _fail_job(db, job, str(e), retry=True)
+    except Exception as e:
+        logger.exception("Ingestion job %s failed", job["id"])
+        await _fail_job(db, job, f"{type(e).__name__}: {e}", retry=True)
+    else:
+        await _finish_job(db, job, result)
+    finally:
+        lease.cancel()
+    if job.get("batch_id"):
+        try:
+            await _finish_batch_if_done(db, job["batch_id"])
+        except Exception:
+            logger.exception("Could not write the courses of batch %s", job["batch_id"])
+
+
+async def _finish_batch_if_done(db, batch_id: str):
+    """Write every course of a batch at once, after its last job has finished"""
+    if await db.ingestion_jobs.count_documents({"batch_id": batch_id, "state": {"$nin": list(FINISHED_STATES)}}):
+        return
+    # Only one caller gets to write the batch, until its write lease runs out
+    now = datetime.utcnow()
+    batch = await db.ingestion_batches.find_one_and_update(
+        {"id": batch_id, "$or": [
+            {"state": "processing"},
+            {"state": "writing", "lease_expires_at": {"$lt": now}},
+        ]},
+        {"$set": {
+            "state": "writing",
+            "lease_expires_at": now + timedelta(seconds=BATCH_WRITE_LEASE_SECONDS),
+            "updated_at": now,
+        }},
+    )
+    if not batch:
+        return
+
+    jobs = await db.ingestion_jobs.find(
+        {"batch_id": batch_id, "state": "completed", "course": {"$exists": True}}, {"_id": 0, "course": 1}
+    ).to_list(None)
+    courses = [job["course"] for job in jobs]
+    if courses:
+        course_questions = {course["id"]: course.pop("questions") for course in courses}
+        questions = [
+            document
+            for course_id, course_question_list in course_questions.items()
+            for document in question_store.question_documents(course_id, course_question_list)
+        ]
+        # Questions left by an interrupted earlier write of the batch
+        await db.questions.delete_many({"course_id": {"$in": list(course_questions)}})
+        if questions:
+            await db.questions.insert_many(questions, ordered=False)
+        await db.courses.bulk_write(
+            [ReplaceOne({"id": course["id"]}, course, upsert=True) for course in courses], ordered=False
+        )
+        payloads = [course_payloads.payload_document(course, course_questions[course["id"]]) for course in courses]
+        payloads = [operation for operation in payloads if operation is not None]
+        if payloads:
+            await db.course_payloads.bulk_write(payloads, ordered=False)
+
+    now = datetime.utcnow()
+    await db.ingestion_batches.update_one(
+        {"id": batch_id},
+        {"$set": {
+            "state": "completed",
+            "courses_created": len(courses),
+            "lease_expires_at": None,
+            "updated_at": now,
+            "finished_at": now,
+        }},
+    )
+    # Only once the batch is complete, so a rewrite still finds the courses
+    await db.ingestion_jobs.update_many({"batch_id": batch_id}, {"$unset": {"course": ""}})
+
+
+async def finish_stalled_batches(db) -> int:
+    """Write batches left unwritten: all jobs finished, or a write that died
+
+    Returns how many batches were looked at.
+    """
+    now = datetime.utcnow()
+    batches = await db.ingestion_batches.find(
+        {"$or": [
+            {"state": "processing"},
+            {"state": "writing", "lease_expires_at": {"$lt": now}},
+        ]},
+        {"_id": 0, "id": 1},
+    ).to_list(None)
+    for batch in batches:
+        try:
+            await _finish_batch_if_done(db, batch["id"])
+        except Exception:
+            logger.exception("Could not write the courses of batch %s", batch["id"])
+    return len(batches)
+
+
+async def run_worker_loop(db):
+    """Claim and run jobs forever, at most PDF_PARSE_CONCURRENCY at a time."""
+    slots = asyncio.Semaphore(parse_pool.PARSE_CONCURRENCY)
+    running = set()
+    wakeup = _get_wakeup()
+    next_sweep = 0.0
+
+    while True:
+        if time.monotonic() >= next_sweep:
+            next_sweep = time.monotonic() + SWEEP_INTERVAL
+            try:
+                await fail_abandoned_jobs(db)
+                await finish_stalled_batches(db)
+            except Exception:
+                logger.exception("Could not sweep abandoned ingestion jobs and batches")
+
+        await slots.acquire()
+        try:
+            job = await claim_next_job(db)
+        except Exception:
+            logger.exception("Could not claim ingestion job")
+            job = None
+
+        if job is None:
+            slots.release()
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(run_job(db, job))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+
+
+# Worker process side
+
+def _get_sync_db():
+    global _sync_db
+    if _sync_db is None:
+        _sync_db = MongoClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    return _sync_db
+
+
+def _progress_reporter(db, job_id: str):
+    last_write = [0.0]
+
+    def report(pages_done: int, pages_total: int):
+        now = time.monotonic()
+        if pages_done < pages_total and now - last_write[0] < PROGRESS_INTERVAL:
+            return
+        last_write[0] = now
+        db.ingestion_jobs.update_one(
+            {"id": job_id},
+            {"$set": {
+                "progress": {"pages_done": pages_done, "pages_total": pages_total},
+                "updated_at": datetime.utcnow(),
+            }},
+        )
+
+    return report
+
+
+def process_job(job_id: str) -> Dict[str, Any]:
+    """Run a claimed job: parse an upload into its course, or regrade a course.
+
+    Runs in a parse pool process.
+    """
+    db = _get_sync_db()
+    job = db.ingestion_jobs.find_one({"id": job_id})
+    if not job:
+        raise IngestionError("Job not found")
+    if job.get("kind") == KIND_REGRADE:
+        return {"course_id": job["course_id"], "changes": grading.regrade_course(db, job["course_id"])}
+
+    memory = MemoryWatch()
+    parse_metrics = metrics.ParseMetrics()
+    report_progress = _progress_reporter(db, job_id)
+
+    def on_page(pages_done: int, pages_total: int):
+        memory.check()
+        report_progress(pages_done, pages_total)
+
+    # The same PDF parsed before by this parser version: skip extraction
+    pdf_hash = job.get("content_hash")
+    with parse_metrics.stage("cache_lookup") as stage:
+        cached = parse_cache.lookup(db, pdf_hash) if pdf_hash else None
+        stage["hit"] = cached is not None
+    from_cache = cached is not None
+    pages_without_text: List[int] = []
+    if from_cache:
+        questions, extraction_backend = cached
+    else:
+        bucket = gridfs.GridFSBucket(db, bucket_name=UPLOAD_BUCKET)
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+                with parse_metrics.stage("download") as stage:
+                    bucket.download_to_stream(ObjectId(job["file_id"]), pdf_file)
+                    pdf_file.flush()
+                    stage["bytes"] = pdf_file.tell()
+                # Scans can never yield questions: turn them away before extraction
+                with parse_metrics.stage("preflight") as stage:
+                    report = preflight.check_text_layer(pdf_file.name)
+                    if report:
+                        pages_without_text = report.pages_without_text
+                        stage.update(pages=report.pages, pages_without_text=len(pages_without_text))
+                if report and report.rejection():
+                    raise IngestionError(report.rejection())
+                document, questions, extraction_backend = extract_and_parse(
+                    pdf_file.name, progress=on_page, metrics=parse_metrics
+                )
+        except IngestionError:
+            raise
+        except ResourceLimitExceeded as e:
+            raise IngestionError(str(e))
+        except gridfs.errors.NoFile:
+            raise IngestionError("Uploaded PDF is no longer stored")
+        except Exception as e:
+            raise IngestionError(f"Could not read PDF: {e}")
+        if pdf_hash:
+            # Keep the page text so the course can be re-parsed later without the file
+            with parse_metrics.stage("store_pages"):
+                page_store.save_pages(db, pdf_hash, document.pages)
+
+        del document
+        if questions and pdf_hash:
+            parse_cache.store(db, pdf_hash, questions, extraction_backend)
+    try:
+        memory.check()
+    except ResourceLimitExceeded as e:
+        raise IngestionError(str(e))
+    if not questions:
+        if pages_without_text:
+            raise IngestionError(
+                "Could not extract questions from PDF; pages without a text layer: "
+                + preflight.page_ranges(pages_without_text)
+            )
+        raise IngestionError("Could not extract questions from PDF")
+
+    result = {
+        "course_id": job["course_id"],
+        "questions_extracted": len(questions),
+        "from_cache": from_cache,
+        "extraction_backend": extraction_backend,
+        "pages_without_text": pages_without_text,
+        "peak_rss_mb": round(memory.peak_mb, 1),
+        "metrics": parse_metrics.to_dict(),
+    }
+    source_fields = {
+        "source_hash": pdf_hash or "",
+        "parser_version": PARSER_VERSION,
+        "extraction_backend": extraction_backend,
+    }
+    if job.get("kind") == KIND_REIMPORT:
+        result["changes"] = _reimport_course(db, job["course_id"], questions, source_fields)
+        return result
+
+    params = job["params"]
+    course = Course(
+        id=job["course_id"],
+        title=params["title"],
+        description=params["description"],
+        is_free=params["is_free"],
+        price=params["price"],
+        questions=questions,
+        total_questions=len(questions),
+        created_by=job["created_by"],
+        **source_fields,
+    )
+    if job.get("batch_id"):
+        # Written with the rest of the batch by _finish_batch_if_done
+        result["course"] = course.dict()
+    else:
+        # Questions first, so the course never shows up without them
+        db.questions.bulk_write(question_store.replace_operations(course.id, questions))
+        db.courses.replace_one({"id": course.id}, question_store.course_document(course), upsert=True)
+        _store_payload(db, course.dict(), questions)
+    return result
+
+
+def _reimport_course(db, course_id: str, questions, fields: Dict[str, Any]) -> Dict[str, int]:
+    """Apply the differences between a course's questions and a new parse"""
+    if not db.courses.find_one({"id": course_id}, {"_id": 1}):
+        raise IngestionError("The course to re-import into no longer exists")
+    diff = reimport.diff_questions(list(question_store.find_questions(db, course_id, with_ordinals=True)), questions)
+    operations = reimport.update_operations(course_id, diff)
+    if operations:
+        db.questions.bulk_write(operations)
+    db.courses.update_one({"id": course_id}, {"$set": {
+        **fields, "total_questions": len(diff.questions), answer_keys.VERSION_FIELD: answer_keys.new_version()
+    }})
+    course = db.courses.find_one({"id": course_id}, {"_id": 0})
+    if course:
+        _store_payload(db, course, diff.questions)
+    return diff.summary()
+
+
+def _store_payload(db, course: Dict[str, Any], questions):
+    """Render the student payload now rather than on the first request"""
+    operation = course_payloads.payload_document(course, questions)
+    if operation is not None:
+        db.course_payloads.bulk_write([operation])
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent.parent / ".env")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    worker_db = AsyncIOMotorClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    asyncio.run(run_worker_loop(worker_db))
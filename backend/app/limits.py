@@ -0,0 +1,163 @@
+# app/limits.py
+"""
+Resource accounting and limits for the parse workers.
+
+Every parse pool process runs under an address-space rlimit, so an
+allocation past it fails with MemoryError instead of growing until the OOM
+killer picks a process, and each task it runs gets an RLIMIT_CPU budget,
+so a runaway parse is interrupted with SIGXCPU. Either way the task fails
+with ResourceLimitExceeded and the worker lives on. Work stuck inside C code
+that never returns to the interpreter is left to the pool's wall-clock
+timeout (see app/parse_pool.py). On Linux a worker is also killed when the
+process that started it exits, so the page extraction workers a parse
+worker starts (see app/pdf_parser.py) go with it when the pool is reset.
+
+Documents are also capped by page count and extracted text size before the
+parsers ever see them.
+
+Configured through the environment (0 disables a limit):
+    PDF_PARSE_MAX_RSS_MB    resident memory a parse worker may reach while
+                            parsing one upload before the job is stopped
+                            (default: 512)
+    PDF_PARSE_MAX_AS_MB     address space of a parse worker process
+                            (default: 2048)
+    PDF_PARSE_CPU_SECONDS   CPU time one task may use in a parse worker
+                            (default: 60)
+    PDF_PARSE_MAX_PAGES     pages a PDF may have (default: 2000)
+    PDF_PARSE_MAX_TEXT_MB   text that may be extracted from one PDF, in
+                            millions of characters (default: 20)
+"""
+import ctypes
+import logging
+import os
+import resource
+import signal
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+MAX_RSS_MB = float(os.environ.get("PDF_PARSE_MAX_RSS_MB", 512))
+MAX_ADDRESS_SPACE_MB = float(os.environ.get("PDF_PARSE_MAX_AS_MB", 2048))
+CPU_SECONDS = int(os.environ.get("PDF_PARSE_CPU_SECONDS", 60))
+MAX_PAGES = int(os.environ.get("PDF_PARSE_MAX_PAGES", 2000))
+MAX_TEXT_CHARS = int(float(os.environ.get("PDF_PARSE_MAX_TEXT_MB", 20)) * 1_000_000)
+
+_PR_SET_PDEATHSIG = 1
+
+
+class ResourceLimitExceeded(BaseException):
+    """A parse job went over one of its resource limits.
+
+    A BaseException, like KeyboardInterrupt, because the SIGXCPU handler can
+    raise it anywhere inside a parser, and the parsers' catch-all ``except
+    Exception`` blocks must not swallow it. Catch it by name.
+    """
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process right now, in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS): fall back to the lifetime peak, in KB on Linux
+        # and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 32 else peak / 1024
+
+
+class MemoryWatch:
+    """Tracks the peak RSS seen while a job runs and enforces a ceiling.
+
+    The worker processes are long-lived, so ru_maxrss would report the peak of
+    every job they ever ran; sampling the current RSS gives a per-job figure.
+    """
+
+    def __init__(self, limit_mb: float = MAX_RSS_MB):
+        self.limit_mb = limit_mb
+        self.peak_mb = current_rss_mb()
+
+    def check(self):
+        rss = current_rss_mb()
+        self.peak_mb = max(self.peak_mb, rss)
+        if self.limit_mb and rss > self.limit_mb:
+            raise ResourceLimitExceeded(
+                f"Parse worker memory reached {rss:.0f} MB, over the {self.limit_mb:.0f} MB limit"
+            )
+
+
+def check_page_count(pages: int):
+    if MAX_PAGES and pages > MAX_PAGES:
+        raise ResourceLimitExceeded(f"PDF has {pages} pages, over the {MAX_PAGES} page limit")
+
+
+def check_text_size(chars: int):
+    """Called with the running total of extracted characters"""
+    if MAX_TEXT_CHARS and chars > MAX_TEXT_CHARS:
+        raise ResourceLimitExceeded(
+            f"PDF text exceeds the limit of {MAX_TEXT_CHARS / 1_000_000:g} million characters"
+        )
+
+
+def _cpu_time_exceeded(signum, frame):
+    raise ResourceLimitExceeded(f"Parsing used more than {CPU_SECONDS} seconds of CPU time")
+
+
+def _die_with_parent():
+    """Have the kernel SIGKILL this process when its parent exits (Linux only)"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.prctl(_PR_SET_PDEATHSIG, signal.SIGKILL)
+    except (OSError, AttributeError):
+        pass
+
+
+def init_worker():
+    """Pool initializer: cap the address space, handle SIGXCPU, die with the parent"""
+    _die_with_parent()
+    if MAX_ADDRESS_SPACE_MB:
+        limit = int(MAX_ADDRESS_SPACE_MB * 1024 * 1024)
+        try:
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        except (ValueError, OSError):
+            logger.warning("Could not limit parse worker address space to %g MB", MAX_ADDRESS_SPACE_MB)
+    signal.signal(signal.SIGXCPU, _cpu_time_exceeded)
+
+
+@contextmanager
+def cpu_budget(seconds: int = CPU_SECONDS):
+    """Deliver SIGXCPU once this process has used ``seconds`` more CPU time
+
+    RLIMIT_CPU counts the whole life of the process, so the soft limit is
+    set relative to the CPU time already used and lifted again afterwards.
+    Only the soft limit is touched: an unprivileged process can never raise
+    its hard limit back up.
+    """
+    if not seconds:
+        yield
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    limit = int(usage.ru_utime + usage.ru_stime) + seconds
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_limited(func, *args):
+    """Run func(*args) in a parse worker under the per-task limits"""
+    try:
+        with cpu_budget():
+            return func(*args)
+    except MemoryError:
+        raise ResourceLimitExceeded(
+            f"Parsing ran out of memory (parse workers are limited to {MAX_ADDRESS_SPACE_MB:g} MB)"
+        )
@@ -0,0 +1,175 @@
+# app/metrics.py
+"""
+Timing and yield metrics.
+
+ParseMetrics collects the stages of one parse (opening the PDF, extracting
+each page, every parse method, dedup) in whichever process does the work and
+turns them into a plain dict, which ingestion jobs store on the job document.
+
+The registry below keeps counters and timing summaries for the running
+process. The API folds every finished parse into it and serves it from
+GET /admin/metrics; other modules add their own series with inc() and
+observe().
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+
+class ParseMetrics:
+    """Per-stage timings and per-method yields of one parse"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.methods: Dict[str, Dict[str, Any]] = {}
+        self.page_ms: Dict[int, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as a stage; the yielded dict takes extra fields, e.g. counts"""
+        fields: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.add_stage(name, (time.perf_counter() - started) * 1000, **fields)
+
+    def add_stage(self, name: str, ms: float, **fields):
+        """Record a stage; repeated stages add up their time"""
+        entry = self.stages.setdefault(name, {"ms": 0.0})
+        entry["ms"] += ms
+        entry.update(fields)
+
+    def add_page(self, page_index: int, ms: float):
+        self.page_ms[page_index] = ms
+
+    def add_method(self, name: str, ms: float, found: int, confidence: float):
+        self.methods[name] = {"ms": ms, "found": found, "contributed": 0, "confidence": round(confidence, 3)}
+
+    def credit(self, name: str, contributed: int):
+        """Questions from this method that survived dedup"""
+        self.methods[name]["contributed"] = contributed
+
+    def merge(self, other: "ParseMetrics"):
+        """Add the stages, pages and methods recorded by another collector"""
+        for name, fields in other.stages.items():
+            fields = dict(fields)
+            self.add_stage(name, fields.pop("ms"), **fields)
+        self.page_ms.update(other.page_ms)
+        self.methods.update(other.methods)
+
+    def total_ms(self) -> float:
+        return sum(stage["ms"] for stage in self.stages.values()) + sum(
+            method["ms"] for method in self.methods.values()
+        ) + sum(self.page_ms.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = {name: {**fields, "ms": round(fields["ms"], 2)} for name, fields in self.stages.items()}
+        if self.page_ms:
+            slowest = max(self.page_ms, key=self.page_ms.get)
+            stages["extract_pages"] = {
+                "ms": round(sum(self.page_ms.values()), 2),
+                "pages": len(self.page_ms),
+                "max_page_ms": round(self.page_ms[slowest], 2),
+                "slowest_page": slowest + 1,
+            }
+        methods = {name: {**fields, "ms": round(fields["ms"], 2)} for name, fields in self.methods.items()}
+        return {
+            "stages": stages,
+            "methods": methods,
+            "total_ms": round(sum(stage["ms"] for stage in stages.values()) + sum(m["ms"] for m in methods.values()), 2),
+        }
+
+
+def summarize_parses(parses: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals over many ParseMetrics dicts, e.g. those of recent ingestion jobs
+
+    A method that costs time across many parses but never contributes a
+    question that survives dedup is a candidate for removal.
+    """
+    count = 0
+    stages: Dict[str, Dict[str, float]] = defaultdict(lambda: {"runs": 0, "ms": 0.0})
+    methods: Dict[str, Dict[str, float]] = defaultdict(lambda: {"runs": 0, "ms": 0.0, "found": 0, "contributed": 0})
+    for parse in parses:
+        count += 1
+        for name, fields in parse.get("stages", {}).items():
+            stages[name]["runs"] += 1
+            stages[name]["ms"] += fields["ms"]
+        for name, fields in parse.get("methods", {}).items():
+            totals = methods[name]
+            totals["runs"] += 1
+            totals["ms"] += fields["ms"]
+            totals["found"] += fields["found"]
+            totals["contributed"] += fields["contributed"]
+
+    for totals in list(stages.values()) + list(methods.values()):
+        totals["ms"] = round(totals["ms"], 1)
+        totals["avg_ms"] = round(totals["ms"] / totals["runs"], 1)
+    for totals in methods.values():
+        totals["contribution_rate"] = round(totals["contributed"] / totals["found"], 3) if totals["found"] else 0.0
+    return {"parses": count, "stages": dict(stages), "methods": dict(methods)}
+
+
+class Registry:
+    """Counters and timing summaries for this process, keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> str:
+        if not labels:
+            return name
+        return name + "{" + ",".join(f"{key}={value}" for key, value in sorted(labels.items())) + "}"
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def observe(self, name: str, ms: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            timing["count"] += 1
+            timing["total_ms"] += ms
+            timing["max_ms"] = max(timing["max_ms"], ms)
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            counters = {key: value for key, value in self._counters.items() if not prefix or key.startswith(prefix)}
+            timings = {
+                key: {
+                    "count": timing["count"],
+                    "total_ms": round(timing["total_ms"], 2),
+                    "avg_ms": round(timing["total_ms"] / timing["count"], 2),
+                    "max_ms": round(timing["max_ms"], 2),
+                }
+                for key, timing in self._timings.items()
+                if not prefix or key.startswith(prefix)
+            }
+        return {"counters": dict(sorted(counters.items())), "timings": dict(sorted(timings.items()))}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+
+
+def record_parse(parse: Dict[str, Any]):
+    """Fold the metrics of one finished parse into the registry"""
+    inc("parses")
+    for name, fields in parse.get("stages", {}).items():
+        observe("parse_stage", fields["ms"], stage=name)
+    for name, fields in parse.get("methods", {}).items():
+        observe("parse_method", fields["ms"], method=name)
+        inc("parse_method_found", fields["found"], method=name)
+        inc("parse_method_contributed", fields["contributed"], method=name)
@@ -0,0 +1,125 @@
+# app/migrate_questions.py
+"""
+Move questions embedded in course documents into the ``questions`` collection.
+
+Courses used to hold their questions in a ``questions`` array; they now live
+one per document (see app/question_store.py). This migration takes courses
+that still have the array in batches: it writes their questions to the
+collection, replacing any left by an interrupted earlier run, then removes the
+array from the course documents. Courses without the array are never touched,
+so running it again after an interruption carries on where it stopped.
+
+The API runs migrate_embedded() at startup, before it serves requests, since
+the read and grading paths only look in the questions collection. Running
+it by hand first keeps a large backlog out of the startup path:
+
+    cd backend && python -m app.migrate_questions
+    cd backend && python -m app.migrate_questions --batch-size 20 --dry-run
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import typer
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from app import answer_keys, question_store
+from app.models import Question
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED = {"questions": {"$exists": True}}
+
+app = typer.Typer(add_completion=False, help=__doc__.split("\n\n")[0])
+
+
+def find_embedded(db, batch_size: int):
+    """Cursor over up to batch_size courses that still embed their questions"""
+    return db.courses.find(EMBEDDED, {"_id": 0, "id": 1, "questions": 1}).limit(batch_size)
+
+
+def batch_writes(courses: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[UpdateOne]]:
+    """Question documents to insert and course updates that finish the move
+
+    Works with pymongo and Motor; insert the questions after deleting any the
+    courses already have, then apply the course updates.
+    """
+    documents = [
+        document
+        for course in courses
+        for document in question_store.question_documents(
+            course["id"], [Question(**question) for question in course["questions"] or []]
+        )
+    ]
+    updates = [
+        UpdateOne(
+            {"id": course["id"]},
+            {"$unset": {"questions": ""}, "$set": {
+                "total_questions": len(course["questions"] or []),
+                # Graders may have cached the course's empty key before the move
+                answer_keys.VERSION_FIELD: answer_keys.new_version(),
+            }},
+        )
+        for course in courses
+    ]
+    return documents, updates
+
+
+def migrate_batch(db, batch_size: int) -> int:
+    """Move the questions of up to batch_size courses; returns how many courses moved"""
+    courses = list(find_embedded(db, batch_size))
+    if not courses:
+        return 0
+    documents, updates = batch_writes(courses)
+    db.questions.delete_many({"course_id": {"$in": [course["id"] for course in courses]}})
+    if documents:
+        db.questions.insert_many(documents, ordered=False)
+    db.courses.bulk_write(updates)
+    return len(courses)
+
+
+async def migrate_embedded(db, batch_size: int = 50) -> int:
+    """Move every embedded course with Motor; returns how many courses moved"""
+    moved = 0
+    while True:
+        courses = await find_embedded(db, batch_size).to_list(None)
+        if not courses:
+            break
+        documents, updates = batch_writes(courses)
+        await db.questions.delete_many({"course_id": {"$in": [course["id"] for course in courses]}})
+        if documents:
+            await db.questions.insert_many(documents, ordered=False)
+        await db.courses.bulk_write(updates)
+        moved += len(courses)
+    if moved:
+        logger.info("Moved the questions of %d courses into the questions collection", moved)
+    return moved
+
+
+@app.command()
+def migrate(
+    batch_size: int = typer.Option(50, "--batch-size", min=1, help="Courses moved per batch"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only count the courses still to move"),
+):
+    """Move embedded course questions into the questions collection."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv(Path(__file__).parent.parent / ".env")
+    db = MongoClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+
+    remaining = db.courses.count_documents(EMBEDDED)
+    logger.info("%d courses still embed their questions", remaining)
+    if dry_run:
+        return
+    moved = 0
+    while True:
+        count = migrate_batch(db, batch_size)
+        if not count:
+            break
+        moved += count
+        logger.info("Moved the questions of %d of %d courses", moved, remaining)
+
+
+if __name__ == "__main__":
+    app()
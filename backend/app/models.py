@@ -0,0 +1,115 @@
+# app/models.py
+"""
+Pydantic models shared by the API routes in server.py and the PDF parsing workers.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+class User(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    email: str
+    password_hash: str
+    full_name: str
+    phone: str
+    is_admin: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+class UserCreate(BaseModel):
+    email: str
+    password: str
+    full_name: str
+    phone: str
+
+class UserLogin(BaseModel):
+    email: str
+    password: str
+
+class Question(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    question_text: str
+    options: List[str]
+    correct_answer: int  # Index of correct option (0-based)
+
+class Course(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    title: str
+    description: str
+    is_free: bool = True
+    price: float = 0.0
+    questions: List[Question] = []  # Stored in the questions collection, see app/question_store.py
+    total_questions: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_by: str  # Admin ID
+    source_hash: str = ""  # SHA-256 of the PDF the questions came from
+    parser_version: int = 0  # pdf_parser.PARSER_VERSION that produced the questions
+    extraction_backend: str = ""  # "pypdf2" or "pdfplumber", see pdf_parser.extract_and_parse
+    answers_version: str = Field(default_factory=lambda: uuid.uuid4().hex)  # see app/answer_keys.py
+
+class CourseCreate(BaseModel):
+    title: str
+    description: str
+    is_free: bool = True
+    price: float = 0.0
+
+class TestAttempt(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    course_id: str
+    answers: Dict[str, int]  # question_id -> selected_option_index
+    score: float
+    total_questions: int
+    completed_at: datetime = Field(default_factory=datetime.utcnow)
+    can_retake: bool = True
+
+class PaymentTransaction(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    course_id: str
+    amount: float
+    currency: str = "NGN"
+    status: str = "pending"  # pending, completed, failed
+    paystack_reference: str = ""
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class IngestionJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: str = "course_upload"  # or "course_reimport", "course_regrade"
+    state: str = "queued"  # queued, running, completed, failed
+    created_by: str  # Admin ID
+    params: Dict[str, Any] = {}  # course fields for course_upload jobs
+    filename: str = ""
+    file_id: str = ""  # GridFS id of the uploaded PDF
+    file_size: int = 0
+    content_hash: str = ""  # SHA-256 of the uploaded PDF
+    course_id: str = Field(default_factory=lambda: str(uuid.uuid4()))  # id given to the created course
+    batch_id: Optional[str] = None  # set for files of a bulk upload
+    progress: Dict[str, int] = {"pages_done": 0, "pages_total": 0}
+    questions_extracted: int = 0
+    from_cache: bool = False
+    extraction_backend: str = ""  # backend whose text the questions came from
+    pages_without_text: List[int] = []  # 1-based pages with no text layer, e.g. scanned
+    changes: Dict[str, int] = {}  # course_reimport: questions added, changed, ...; course_regrade: attempts rescored
+    peak_rss_mb: float = 0.0  # highest worker RSS sampled while parsing
+    metrics: Dict[str, Any] = {}  # per-stage timings and yields, see app/metrics.py
+    errors: List[str] = []
+    attempts: int = 0
+    max_attempts: int = 3
+    lease_expires_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+class IngestionBatch(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    state: str = "processing"  # processing, writing, completed
+    created_by: str  # Admin ID
+    job_ids: List[str] = []
+    rejected: List[Dict[str, str]] = []  # files refused before parsing: filename, error
+    courses_created: int = 0
+    lease_expires_at: Optional[datetime] = None  # while writing
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,35 @@
+# app/page_store.py
+"""
+Extracted page text of every ingested PDF, so the parsers can be re-run over
+existing courses without the original file and without pdfplumber.
+
+One document per page in the ``pdf_pages`` collection, keyed by the PDF's
+SHA-256 and the 0-based page number, with the text zlib-compressed.
+"""
+import zlib
+from typing import List, Optional
+
+from pymongo import ASCENDING
+
+from app.pdf_parser import ExtractedDocument
+
+
+async def load_document(db, content_hash: str) -> Optional[ExtractedDocument]:
+    """Rebuild the extracted document for a stored PDF, or None if not stored"""
+    cursor = db.pdf_pages.find({"content_hash": content_hash}, {"_id": 0, "page": 1, "text": 1}).sort("page", ASCENDING)
+    pages = [zlib.decompress(entry["text"]).decode("utf-8") async for entry in cursor]
+    if not pages:
+        return None
+    return ExtractedDocument.from_pages(pages)
+
+
+# Worker process side (synchronous pymongo)
+
+def save_pages(db, content_hash: str, pages: List[str]):
+    if db.pdf_pages.count_documents({"content_hash": content_hash}) == len(pages):
+        return
+    db.pdf_pages.delete_many({"content_hash": content_hash})
+    db.pdf_pages.insert_many([
+        {"content_hash": content_hash, "page": page_num, "text": zlib.compress(text.encode("utf-8"))}
+        for page_num, text in enumerate(pages)
+    ])
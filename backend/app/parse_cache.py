@@ -0,0 +1,90 @@
+# app/parse_cache.py
+"""
+Cache of parse results for PDFs that have been uploaded before.
+
+Entries live in the ``parsed_pdfs`` collection, keyed by the SHA-256 of the
+uploaded bytes (taken while the upload streams in, see
+app/ingestion_jobs.py) and the parser version, so a parser change never serves stale
+results. An entry also records the extraction backend that was asked for
+(PDF_EXTRACTION_BACKEND, see app/pdf_parser.py) and is only served to a
+parse asking for the same one: a PyPDF2 result never answers a request for
+pdfplumber. A document keeps one entry, for the backend it was last parsed
+with. Each hit refreshes ``last_used_at``; a TTL index on that field drops
+entries nobody has used for PARSE_CACHE_TTL_DAYS, and inserts trim the
+collection back to PARSE_CACHE_MAX_ENTRIES by evicting the least recently
+used entries. Both indexes are declared in app/indexes.py.
+"""
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app.models import Question
+from app.pdf_parser import EXTRACTION_BACKEND, PARSER_VERSION
+
+CACHE_TTL_DAYS = int(os.environ.get("PARSE_CACHE_TTL_DAYS", 30))
+CACHE_MAX_ENTRIES = int(os.environ.get("PARSE_CACHE_MAX_ENTRIES", 500))
+
+
+class CachedParse(NamedTuple):
+    questions: List[Question]
+    extraction_backend: str
+
+
+async def purge(db, pdf_hash: Optional[str] = None) -> int:
+    """Delete every cache entry, or only those for one document hash"""
+    result = await db.parsed_pdfs.delete_many({"content_hash": pdf_hash} if pdf_hash else {})
+    return result.deleted_count
+
+
+# Worker process side (synchronous pymongo)
+
+def lookup(db, pdf_hash: str, backend: Optional[str] = None) -> Optional[CachedParse]:
+    """Return the cached questions for this document, with fresh ids, or None
+
+    ``backend`` is the extraction backend asked for, PDF_EXTRACTION_BACKEND
+    by default.
+    """
+    entry = db.parsed_pdfs.find_one_and_update(
+        {
+            "content_hash": pdf_hash,
+            "parser_version": PARSER_VERSION,
+            "requested_backend": backend or EXTRACTION_BACKEND,
+        },
+        {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"hits": 1}},
+        projection={"questions": 1, "extraction_backend": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not entry:
+        return None
+    return CachedParse(
+        [Question(**question) for question in entry["questions"]],
+        entry.get("extraction_backend", ""),
+    )
+
+
+def store(
+    db, pdf_hash: str, questions: List[Question], extraction_backend: str = "", backend: Optional[str] = None
+):
+    """Cache a parse; ``backend`` is the one asked for, ``extraction_backend`` the one used"""
+    now = datetime.utcnow()
+    db.parsed_pdfs.update_one(
+        {"content_hash": pdf_hash, "parser_version": PARSER_VERSION},
+        {
+            "$set": {
+                "questions": [q.dict(exclude={"id"}) for q in questions],
+                "questions_count": len(questions),
+                "extraction_backend": extraction_backend,
+                "requested_backend": backend or EXTRACTION_BACKEND,
+                "last_used_at": now,
+            },
+            "$setOnInsert": {"created_at": now, "hits": 0},
+        },
+        upsert=True,
+    )
+
+    overflow = db.parsed_pdfs.count_documents({}) - CACHE_MAX_ENTRIES
+    if overflow > 0:
+        stale = db.parsed_pdfs.find({}, {"_id": 1}).sort("last_used_at", ASCENDING).limit(overflow)
+        db.parsed_pdfs.delete_many({"_id": {"$in": [entry["_id"] for entry in stale]}})
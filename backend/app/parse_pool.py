@@ -0,0 +1,106 @@
+# app/parse_pool.py
+"""
+Runs PDF parsing in a dedicated process pool so the API event loop stays free
+while admins upload course PDFs. The workers run under the CPU and memory
+limits of app/limits.py, and a worker that dies anyway (a crash in native
+code, or the OOM killer) only fails the tasks it was running: the pool is
+replaced and the API process carries on.
+
+Configured through the environment:
+    PDF_PARSE_WORKERS      worker processes in the pool (default: min(2, CPUs))
+    PDF_PARSE_CONCURRENCY  parse jobs allowed in flight per API process
+                           (default: PDF_PARSE_WORKERS)
+    PDF_PARSE_TIMEOUT      seconds a single parse job may run (default: 120)
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import limits
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", min(2, os.cpu_count() or 1)))
+PARSE_CONCURRENCY = int(os.environ.get("PDF_PARSE_CONCURRENCY", PARSE_WORKERS))
+PARSE_TIMEOUT = float(os.environ.get("PDF_PARSE_TIMEOUT", 120))
+
+_executor = None
+_semaphore = None
+
+
+class ParseTimeout(Exception):
+    """Raised when a parse job runs longer than PDF_PARSE_TIMEOUT."""
+
+
+class WorkerCrashed(Exception):
+    """Raised when the worker process running a parse job died."""
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the API process holds Mongo client threads and an
+        # event loop that must not be copied into the workers.
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=limits.init_worker,
+        )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+    return _semaphore
+
+
+def _reset_executor(executor: ProcessPoolExecutor):
+    """Kill the pool's workers so a stuck job stops consuming CPU.
+
+    Every task of a broken pool fails at once; only the first to get here
+    replaces it, and a pool created since is left alone.
+    """
+    global _executor
+    if executor is not _executor:
+        return
+    _executor = None
+    # ProcessPoolExecutor has no public way to stop a running task, so
+    # terminate the worker processes directly before discarding the pool.
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_pool(func, *args, timeout: float = None):
+    """Run func(*args) in the parse pool with bounded concurrency and a timeout.
+
+    Raises limits.ResourceLimitExceeded if the task went over its CPU, memory
+    or document limits, and WorkerCrashed if its worker process died.
+    """
+    timeout = PARSE_TIMEOUT if timeout is None else timeout
+    async with _get_semaphore():
+        loop = asyncio.get_running_loop()
+        executor = get_executor()
+        future = loop.run_in_executor(executor, limits.run_limited, func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Parse job %s timed out after %ss", getattr(func, "__name__", func), timeout)
+            _reset_executor(executor)
+            raise ParseTimeout(f"Parsing did not finish within {timeout:g} seconds")
+        except BrokenProcessPool:
+            logger.error("Parse pool broke while running %s", getattr(func, "__name__", func))
+            _reset_executor(executor)
+            raise WorkerCrashed("The parse worker process died while parsing (killed by the OS or crashed)")
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
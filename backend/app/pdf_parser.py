@@ -0,0 +1,1109 @@
+# app/pdf_parser.py
+"""
+PDF question extraction. Kept free of FastAPI and Mongo imports so the parsing
+functions can run inside the parse worker processes (see app/parse_pool.py).
+"""
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import pdfplumber
+from pydantic import BaseModel
+from PyPDF2 import PdfReader
+
+from app.dedup import remove_near_duplicates
+from app.limits import check_page_count, check_text_size, init_worker, run_limited
+from app.metrics import ParseMetrics
+from app.models import Question
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change here alters the questions extracted from a PDF, so
+# cached parse results from the old heuristics are not reused.
+PARSER_VERSION = 3
+# Leading words of a stem used to find it again in the extracted text
+STEM_MATCH_WORDS = 6
+
+class ExtractedDocument(BaseModel):
+    """Text of a PDF, extracted once and shared by every parsing method.
+
+    ``text`` is the non-empty pages joined with newlines, exactly as the
+    parsers have always seen it, and ``page_offsets[i]`` is where page ``i``
+    starts within it.
+    """
+    pages: List[str]
+    text: str
+    page_offsets: List[int]
+
+    @classmethod
+    def from_pages(cls, pages: List[str]) -> "ExtractedDocument":
+        text_parts = []
+        page_offsets = []
+        offset = 0
+        for page_text in pages:
+            page_offsets.append(offset)
+            if page_text:
+                text_parts.append(page_text + '\n')
+                offset += len(page_text) + 1
+        return cls(pages=pages, text=''.join(text_parts), page_offsets=page_offsets)
+
+    def page_at(self, offset: int) -> int:
+        """0-based index of the page that contains the given text offset"""
+        return max(bisect_right(self.page_offsets, offset) - 1, 0)
+
+    def find_stem(self, question_text: str, start: int = 0) -> int:
+        """Offset of a parsed question's stem in the text at or after start, or -1
+
+        Parsers join wrapped lines with single spaces, so the leading words of
+        the stem are matched across any run of whitespace.
+        """
+        words = question_text.split()[:STEM_MATCH_WORDS]
+        if not words:
+            return -1
+        match = re.compile(r'\s+'.join(map(re.escape, words))).search(self.text, start)
+        return match.start() if match else -1
+
+
+def question_pages(document: ExtractedDocument, questions: List[Question]) -> List[Optional[int]]:
+    """0-based source page of each question, or None where its stem is not found
+
+    Questions are searched for in order from where the previous one was found,
+    falling back to the whole text for parsers that return them out of order.
+    """
+    pages = []
+    cursor = 0
+    for question in questions:
+        offset = document.find_stem(question.question_text, cursor)
+        if offset < 0:
+            offset = document.find_stem(question.question_text)
+        if offset < 0:
+            pages.append(None)
+            continue
+        cursor = offset + 1
+        pages.append(document.page_at(offset))
+    return pages
+
+
+# PDF bytes, or the path of a file holding them
+PdfSource = Union[bytes, str, os.PathLike]
+
+
+@contextmanager
+def open_pdf(source: PdfSource, pages: Optional[range] = None):
+    """Open a PDF with pdfplumber from bytes or from a file path
+
+    Files are memory-mapped rather than read, so the OS pages the bytes in and
+    out on demand instead of the process holding its own copy.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        with pdfplumber.open(BytesIO(source), pages=pages) as pdf:
+            yield pdf
+        return
+    with open(source, 'rb') as pdf_file, mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with pdfplumber.open(mapped, pages=pages) as pdf:
+            yield pdf
+
+
+def extract_document(
+    pdf_source: PdfSource,
+    progress: Optional[Callable[[int, int], None]] = None,
+    workers: Optional[int] = None,
+    metrics: Optional[ParseMetrics] = None,
+) -> ExtractedDocument:
+    """Run pdfplumber text extraction over every page, once
+
+    Documents of at least PDF_EXTRACT_PARALLEL_MIN_PAGES pages are split into
+    page ranges and extracted by ``workers`` processes (PDF_EXTRACT_WORKERS
+    by default); shorter ones are extracted in this process.
+
+    Each page's cached layout objects are released as soon as its text has
+    been taken, so memory does not grow with the page count.
+
+    progress, if given, is called as progress(pages_done, pages_total) as
+    pages are extracted; metrics, if given, records the time spent opening the
+    PDF and extracting each page.
+    """
+    workers = EXTRACT_WORKERS if workers is None else workers
+    metrics = metrics or ParseMetrics()
+    pages = []
+    started = time.perf_counter()
+    with open_pdf(pdf_source) as pdf:
+        total_pages = len(pdf.pages)
+        metrics.add_stage('open', (time.perf_counter() - started) * 1000, pages=total_pages)
+        check_page_count(total_pages)
+        if workers <= 1 or total_pages < PARALLEL_MIN_PAGES:
+            text_chars = 0
+            for page_index, page in enumerate(pdf.pages):
+                page_started = time.perf_counter()
+                pages.append(page.extract_text() or '')
+                page.close()
+                text_chars += len(pages[-1])
+                check_text_size(text_chars)
+                metrics.add_page(page_index, (time.perf_counter() - page_started) * 1000)
+                if progress:
+                    progress(page_index + 1, total_pages)
+            return ExtractedDocument.from_pages(pages)
+
+    return ExtractedDocument.from_pages(
+        _extract_parallel(pdf_source, total_pages, workers, progress, metrics)
+    )
+
+
+# Parallel extraction
+#
+# Each worker opens the same PDF (bytes, or better a file path so the bytes
+# are not copied to every worker) and extracts one contiguous page range; the
+# ranges are stitched back together in page order. Extraction workers run
+# under the same limits as the parse pool (see app/limits.py) and exit with
+# the process that started them.
+
+EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", 1))
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_EXTRACT_PARALLEL_MIN_PAGES", 40))
+# More ranges than workers so one slow range does not leave the others idle
+CHUNKS_PER_WORKER = 4
+
+_extract_executor = None
+_extract_executor_workers = 0
+
+
+def _get_extract_executor(workers: int) -> ProcessPoolExecutor:
+    global _extract_executor, _extract_executor_workers
+    if _extract_executor is None or _extract_executor_workers != workers:
+        if _extract_executor is not None:
+            _extract_executor.shutdown(wait=False)
+        _extract_executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+        _extract_executor_workers = workers
+    return _extract_executor
+
+
+def _extract_page_range(pdf_source: PdfSource, start: int, stop: int) -> Tuple[List[str], float, List[float]]:
+    """Extract the text of pages [start, stop), 0-based
+
+    Returns the page texts, the ms spent opening the PDF and the ms spent on
+    each page.
+    """
+    pages = []
+    page_ms = []
+    started = time.perf_counter()
+    with open_pdf(pdf_source, pages=range(start + 1, stop + 1)) as pdf:
+        open_ms = (time.perf_counter() - started) * 1000
+        for page in pdf.pages:
+            page_started = time.perf_counter()
+            pages.append(page.extract_text() or '')
+            page.close()
+            page_ms.append((time.perf_counter() - page_started) * 1000)
+    return pages, open_ms, page_ms
+
+
+def _extract_parallel(
+    pdf_source: PdfSource,
+    total_pages: int,
+    workers: int,
+    progress: Optional[Callable[[int, int], None]],
+    metrics: ParseMetrics,
+) -> List[str]:
+    chunk_size = max(1, -(-total_pages // (workers * CHUNKS_PER_WORKER)))
+    executor = _get_extract_executor(workers)
+    futures = {
+        executor.submit(run_limited, _extract_page_range, pdf_source, start, min(start + chunk_size, total_pages)): start
+        for start in range(0, total_pages, chunk_size)
+    }
+
+    pages = [''] * total_pages
+    pages_done = 0
+    text_chars = 0
+    for future in as_completed(futures):
+        start = futures[future]
+        chunk, open_ms, page_ms = future.result()
+        pages[start:start + len(chunk)] = chunk
+        text_chars += sum(len(page) for page in chunk)
+        check_text_size(text_chars)
+        # Every worker opens the PDF again; the stage adds those up
+        metrics.add_stage('open', open_ms)
+        for offset, ms in enumerate(page_ms):
+            metrics.add_page(start + offset, ms)
+        pages_done += len(chunk)
+        if progress:
+            progress(pages_done, total_pages)
+    return pages
+
+
+# Extraction backends
+#
+# PyPDF2 reads the text operators of each page without pdfplumber's layout
+# analysis and is several times faster, which is all a clean text-only export
+# needs. On PDFs with kerned or multi-column text it splits words ("T
+# ranslation"), puts spaces before punctuation and runs lines together, which
+# the parsers cannot recover from. With PDF_EXTRACTION_BACKEND=auto every PDF
+# is tried with PyPDF2 first and re-extracted with pdfplumber when the text
+# shows those artifacts or parses to fewer questions than it appears to hold.
+
+BACKEND_AUTO = 'auto'
+BACKEND_PYPDF2 = 'pypdf2'
+BACKEND_PDFPLUMBER = 'pdfplumber'
+EXTRACTION_BACKEND = os.environ.get("PDF_EXTRACTION_BACKEND", BACKEND_AUTO)
+# PyPDF2 text with more split words or spaced punctuation than this per
+# 10,000 characters goes to pdfplumber
+MAX_SPLIT_WORDS_PER_10K = 5
+# ... as does text where this share of lines are longer than LONG_LINE_CHARS,
+# the sign of columns or table cells run together
+LONG_LINE_CHARS = 300
+MAX_LONG_LINE_RATIO = 0.05
+# ... as does text that parses to less than this share of the estimated
+# question count
+MIN_YIELD_RATIO = 0.8
+
+# A capital split from the rest of its word ("T ranslation", but not "A wide"
+# or "I think"), and spaces inside URLs or before commas ("w .php", "Monday ,")
+_SPLIT_WORD = re.compile(r'\b(?![AI] )[A-Z] [a-z]{2,}|[a-z] \.[a-z]|\w ,')
+
+
+class ParseOutcome(NamedTuple):
+    document: ExtractedDocument
+    questions: List[Question]
+    backend: str  # the extraction backend whose text the questions came from
+
+
+@contextmanager
+def open_pdf_fast(source: PdfSource):
+    """Open a PDF with PyPDF2 from bytes or from a file path"""
+    if isinstance(source, (bytes, bytearray)):
+        yield PdfReader(BytesIO(source))
+        return
+    with open(source, 'rb') as pdf_file:
+        yield PdfReader(pdf_file)
+
+
+def layout_problems(pages: List[str]) -> List[str]:
+    """Signs that PyPDF2 garbled the layout of these pages; empty if none"""
+    text = '\n'.join(page for page in pages if page)
+    if not text.strip():
+        return ['no_text']
+    problems = []
+    if sum(1 for page in pages if not page.strip()) * 2 > len(pages):
+        problems.append('blank_pages')
+    if len(_SPLIT_WORD.findall(text)) * 10000 > MAX_SPLIT_WORDS_PER_10K * len(text):
+        problems.append('split_words')
+    lines = [line for line in text.split('\n') if line.strip()]
+    if sum(1 for line in lines if len(line) > LONG_LINE_CHARS) > MAX_LONG_LINE_RATIO * len(lines):
+        problems.append('long_lines')
+    return problems
+
+
+def extract_document_fast(
+    pdf_source: PdfSource,
+    progress: Optional[Callable[[int, int], None]] = None,
+    check: bool = False,
+) -> Tuple[Optional[ExtractedDocument], List[str]]:
+    """Extract every page's text with PyPDF2
+
+    With ``check``, the first FINGERPRINT_PAGES pages are checked with
+    layout_problems() before the rest are extracted, and then the whole
+    document; returns (None, problems) as soon as any are found, so a PDF
+    PyPDF2 cannot read well costs little before falling back.
+    """
+    with open_pdf_fast(pdf_source) as reader:
+        total_pages = len(reader.pages)
+        check_page_count(total_pages)
+        pages = []
+        text_chars = 0
+        for page_index, page in enumerate(reader.pages):
+            pages.append(page.extract_text() or '')
+            text_chars += len(pages[-1])
+            check_text_size(text_chars)
+            if progress:
+                progress(page_index + 1, total_pages)
+            if check and page_index + 1 == min(FINGERPRINT_PAGES, total_pages) < total_pages:
+                problems = layout_problems(pages)
+                if problems:
+                    return None, problems
+    problems = layout_problems(pages) if check else []
+    if problems:
+        return None, problems
+    return ExtractedDocument.from_pages(pages), []
+
+
+def extract_and_parse(
+    pdf_source: PdfSource,
+    progress: Optional[Callable[[int, int], None]] = None,
+    metrics: Optional[ParseMetrics] = None,
+    backend: Optional[str] = None,
+) -> ParseOutcome:
+    """Extract a PDF's text with the configured backend and parse it
+
+    ``backend`` (PDF_EXTRACTION_BACKEND by default) is 'pypdf2',
+    'pdfplumber', or 'auto' to use PyPDF2 where its text parses as well as
+    it should and pdfplumber otherwise. metrics, if given, records the
+    stages of the extraction that was kept, and under 'fast_extract' and
+    'fast_parse' the time a rejected PyPDF2 attempt cost and why it was
+    rejected.
+    """
+    backend = backend or EXTRACTION_BACKEND
+    metrics = metrics or ParseMetrics()
+    if backend not in (BACKEND_AUTO, BACKEND_PYPDF2, BACKEND_PDFPLUMBER):
+        raise ValueError(f"Unknown extraction backend {backend!r}")
+
+    if backend != BACKEND_PDFPLUMBER:
+        check = backend == BACKEND_AUTO
+        with metrics.stage('fast_extract'):
+            try:
+                document, problems = extract_document_fast(pdf_source, progress, check=check)
+            except MemoryError:
+                raise
+            except Exception as e:
+                if not check:
+                    raise
+                document, problems = None, [f'error: {type(e).__name__}']
+
+        if document is not None:
+            attempt = ParseMetrics()
+            questions = parse_extracted_document(document, attempt)
+            expected = estimate_question_count(document.text)
+            if not check or (questions and len(questions) >= expected * MIN_YIELD_RATIO):
+                metrics.merge(attempt)
+                return ParseOutcome(document, questions, BACKEND_PYPDF2)
+            metrics.add_stage('fast_parse', attempt.total_ms(), questions=len(questions), expected_questions=expected)
+            problems = ['low_yield']
+
+        metrics.add_stage('fast_extract', 0.0, fallback=problems)
+        logger.info("PyPDF2 text rejected (%s), extracting with pdfplumber", ", ".join(problems))
+
+    document = extract_document(pdf_source, progress, metrics=metrics)
+    return ParseOutcome(document, parse_extracted_document(document, metrics), BACKEND_PDFPLUMBER)
+
+
+# Enhanced PDF Parser Function
+def parse_pdf_to_questions(
+    pdf_source: PdfSource,
+    progress: Optional[Callable[[int, int], None]] = None,
+    metrics: Optional[ParseMetrics] = None,
+) -> List[Question]:
+    """Parse PDF content and extract questions using multiple enhanced methods
+
+    progress, if given, is called as progress(pages_done, pages_total) after
+    each page's text has been extracted.
+    """
+    try:
+        return extract_and_parse(pdf_source, progress, metrics).questions
+    except Exception:
+        logger.exception("Could not extract text from PDF")
+        return []
+
+# Format detection
+#
+# Rather than running every parser and throwing most of the results away in
+# remove_duplicate_questions, look at the first few pages, score each parser
+# on how well the text matches the layout it was written for, and run them
+# best-first until the estimated number of questions has been found. A
+# document that no parser covers on its own still runs them all, as before.
+
+FINGERPRINT_PAGES = 3
+
+_MOODLE_BLOCK = re.compile(r'^\d+\nQuestion$', re.MULTILINE)
+_MARK_OUT_OF = re.compile(r'^Mark .* out of', re.MULTILINE)
+_Q_PREFIX = re.compile(r'^Q\d+[.:]', re.MULTILINE)
+_NUMBERED = re.compile(r'^\d+[.)]\s*\S', re.MULTILINE)
+_LINE_OPTION = re.compile(r'^[A-Da-d][.)]', re.MULTILINE)
+_LINE_OPTION_A = re.compile(r'^[Aa][.)]', re.MULTILINE)
+_INLINE_OPTION = re.compile(r'\S[ \t]+[B-D][.)][ \t]')
+
+
+class QuestionParser(NamedTuple):
+    name: str
+    parse: Callable[[ExtractedDocument], List[Question]]
+    # Confidence in [0, 1] that the parser fits, from a sample of the text
+    fingerprint: Callable[[str], float]
+
+
+def _structured_fingerprint(sample: str) -> float:
+    blocks = len(_MOODLE_BLOCK.findall(sample))
+    if not blocks:
+        return 0.1
+    marks = len(_MARK_OUT_OF.findall(sample))
+    select_one = sample.count('Select one:')
+    return min(1.0, 0.5 + 0.25 * min(marks / blocks, 1) + 0.25 * min(select_one / blocks, 1))
+
+
+def _multiline_fingerprint(sample: str) -> float:
+    options = len(_LINE_OPTION.findall(sample))
+    if not options:
+        return 0.0
+    # Numbered stems are line questions too (page_by_page misses the first
+    # one on every page), unless their options run on inline
+    inline = len(_INLINE_OPTION.findall(sample))
+    prefixed = min(1.0, len(_Q_PREFIX.findall(sample)) * 4 / options)
+    numbered = 0.9 * min(1.0, len(_NUMBERED.findall(sample)) * 4 / options) * options / (options + inline)
+    return max(prefixed, numbered)
+
+
+def _page_by_page_fingerprint(sample: str) -> float:
+    options = len(_LINE_OPTION.findall(sample))
+    if not options:
+        return 0.0
+    return 0.8 * min(1.0, len(_NUMBERED.findall(sample)) * 4 / options)
+
+
+def _continuous_fingerprint(sample: str) -> float:
+    inline = len(_INLINE_OPTION.findall(sample))
+    if not inline:
+        return 0.0
+    return inline / (inline + len(_LINE_OPTION.findall(sample)))
+
+
+PARSERS: List[QuestionParser] = [
+    QuestionParser('enhanced_structured', lambda doc: parse_enhanced_structured_format(doc.text), _structured_fingerprint),
+    QuestionParser('multiline', lambda doc: parse_multiline_questions(doc.text), _multiline_fingerprint),
+    QuestionParser('continuous', lambda doc: parse_continuous_text(doc.text), _continuous_fingerprint),
+    QuestionParser('page_by_page', lambda doc: parse_page_by_page(doc.pages), _page_by_page_fingerprint),
+]
+
+
+def detect_format(document: ExtractedDocument) -> List[Tuple[QuestionParser, float]]:
+    """Score every registered parser against the first pages, best first"""
+    sample = '\n'.join(page for page in document.pages[:FINGERPRINT_PAGES] if page)
+    scored = [(parser, parser.fingerprint(sample)) for parser in PARSERS]
+    return sorted(scored, key=lambda pair: pair[1], reverse=True)
+
+
+def estimate_question_count(text: str) -> int:
+    """Rough count of the questions in the document, used to judge parser yield"""
+    select_one = text.count('Select one:')
+    if select_one:
+        return select_one
+    return len(_LINE_OPTION_A.findall(text))
+
+
+def parse_extracted_document(document: ExtractedDocument, metrics: Optional[ParseMetrics] = None) -> List[Question]:
+    """Parse an extracted document with the parsers that best fit its format
+
+    metrics, if given, records the time and yield of format detection, each
+    parser that ran and dedup, and how many of each parser's questions
+    survived dedup.
+    """
+    metrics = metrics or ParseMetrics()
+    try:
+        text = document.text
+        
+        with metrics.stage('detect') as stage:
+            expected = estimate_question_count(text)
+            ranked = detect_format(document)
+            stage['expected_questions'] = expected
+        
+        all_questions = []
+        unique_questions = []
+        source = {}  # id() of each parsed question -> the parser that found it
+        for parser, confidence in ranked:
+            started = time.perf_counter()
+            parsed = parser.parse(document)
+            metrics.add_method(parser.name, (time.perf_counter() - started) * 1000, len(parsed), confidence)
+            if parsed:
+                source.update((id(question), parser.name) for question in parsed)
+                all_questions.extend(parsed)
+                with metrics.stage('dedup') as stage:
+                    unique_questions = remove_duplicate_questions(all_questions)
+                    stage.update(candidates=len(all_questions), unique=len(unique_questions))
+            if unique_questions and len(unique_questions) >= expected:
+                break
+        
+        for name in metrics.methods:
+            metrics.credit(name, sum(1 for q in unique_questions if source[id(q)] == name))
+        logger.info(
+            "Parsed %d questions (estimated %d) from %d pages: %s",
+            len(unique_questions), expected, len(document.pages),
+            ", ".join(f"{name} {m['contributed']}/{m['found']}" for name, m in metrics.methods.items()),
+        )
+        
+        return unique_questions
+        
+    except MemoryError:
+        raise
+    except Exception:
+        logger.exception("Error parsing PDF")
+        return []
+
+def parse_with_metrics(document: ExtractedDocument) -> Tuple[List[Question], Dict[str, Any]]:
+    """parse_extracted_document returning its metrics too, for the parse pool"""
+    metrics = ParseMetrics()
+    questions = parse_extracted_document(document, metrics)
+    return questions, metrics.to_dict()
+
+def remove_duplicate_questions(questions: List[Question]) -> List[Question]:
+    """Collapse near-duplicate questions, keeping the best-formed copy of each
+
+    A prefix match merged distinct questions that share a long stem and missed
+    copies that differ only in numbering or a dropped option; see app/dedup.py.
+    """
+    return remove_near_duplicates(questions)
+
+# Line classification
+#
+# Every line-oriented helper below works on the same labelled line stream:
+# classify_lines() runs one precompiled pattern per line and the helpers then
+# branch on Line.kind instead of re-matching their own regexes.
+
+LINE_BLANK = 'blank'
+LINE_SELECT_ONE = 'select_one'  # a "Select one:" line before Moodle options
+LINE_NOISE = 'noise'  # page footer URLs and date headers
+LINE_METADATA = 'metadata'  # "Mark 1.00 out of 1.00", attempt summary lines
+LINE_OPTION = 'option'  # "A. ...", "b) ...", "C: ..."
+LINE_NUMBER = 'number'  # a bare question number
+LINE_QUESTION = 'question'  # "Q1. ...", "Question 3:", "12. ...", "4 The ..."
+LINE_TEXT = 'text'
+
+_LINE_PATTERN = re.compile(r"""
+    (?P<select_one>(?i:select\ one):?\s*$)
+  | (?P<noise>.*?https?://|\d+/\d+/\d+)
+  | (?P<metadata>Mark\b.*\bout\ of\b|Page\s+\d+|(?:Started\ on|Completed\ on|Time\ taken|Grade)\b)
+  | (?P<option>(?P<letter>[A-Da-d])[.):]\s*)
+  | (?P<number>\d+$)
+  | (?P<question>(?:(?i:question)\b\s*\d*[.:]?|Q\d*[.:]|Q\d+\b|\d+[.)]|\d+(?=\s*[A-Za-z]))\s*)
+""", re.VERBOSE)
+
+
+class Line(NamedTuple):
+    text: str  # the stripped line
+    kind: str
+    body: str  # text after the option or question marker, else the text
+    letter: str = ''  # option letter as written
+
+
+def classify_line(raw: str) -> Line:
+    text = raw.strip()
+    if not text:
+        return Line(text, LINE_BLANK, text)
+    match = _LINE_PATTERN.match(text)
+    if not match:
+        return Line(text, LINE_TEXT, text)
+    kind = match.lastgroup if match.lastgroup != 'letter' else LINE_OPTION
+    if kind in (LINE_OPTION, LINE_QUESTION):
+        return Line(text, kind, text[match.end(kind):], match.group('letter') or '')
+    return Line(text, kind, text)
+
+
+def classify_lines(text: str) -> List[Line]:
+    return [classify_line(raw) for raw in text.split('\n')]
+
+
+def _is_option(line: Line, uppercase_only: bool = False) -> bool:
+    return line.kind == LINE_OPTION and (not uppercase_only or line.letter.isupper())
+
+def parse_structured_format(text: str) -> List[Question]:
+    """Parse structured format like the GST104 sample"""
+    questions = []
+    
+    # Split by question markers
+    question_blocks = re.split(r'\n\d+\nQuestion\n', text)
+    
+    for i, block in enumerate(question_blocks[1:], 1):
+        try:
+            lines = [line for line in classify_lines(block) if line.kind != LINE_BLANK]
+            
+            # Find question text
+            question_text = ''
+            options = []
+            
+            # Look for question text (after Mark line, before Select one)
+            start_collecting = False
+            for line in lines:
+                if line.kind == LINE_METADATA:
+                    start_collecting = True
+                    continue
+                
+                if start_collecting and line.kind == LINE_SELECT_ONE:
+                    break
+                    
+                if start_collecting:
+                    question_text += line.text + ' '
+            
+            question_text = question_text.strip()
+            
+            # Extract options after "Select one:"
+            collect_options = False
+            for line in lines:
+                if line.kind == LINE_SELECT_ONE:
+                    collect_options = True
+                    continue
+                
+                if collect_options and line.kind != LINE_NOISE:
+                    if len(options) < 4:
+                        options.append(line.text)
+            
+            if question_text and len(options) >= 2:
+                questions.append(Question(
+                    question_text=question_text,
+                    options=options[:4],  # Take max 4 options
+                    correct_answer=0  # Default to first option, admin can adjust
+                ))
+                
+        except Exception as e:
+            continue
+    
+    return questions
+
+def parse_simple_format(text: str) -> List[Question]:
+    """Parse simple Q: A: format"""
+    questions = []
+    
+    # Look for Q: or Question: patterns
+    current_question = ''
+    current_options = []
+    
+    for line in classify_lines(text):
+        # Check for question markers
+        if line.kind == LINE_QUESTION and line.text[:1] in 'Qq':
+            # Save previous question if exists
+            if current_question and current_options:
+                questions.append(Question(
+                    question_text=current_question,
+                    options=current_options[:4],
+                    correct_answer=0
+                ))
+            
+            # Start new question
+            current_question = line.body
+            current_options = []
+            
+        # Check for option markers
+        elif _is_option(line, uppercase_only=True):
+            if current_question:
+                current_options.append(line.body)
+    
+    # Don't forget the last question
+    if current_question and current_options:
+        questions.append(Question(
+            question_text=current_question,
+            options=current_options[:4],
+            correct_answer=0
+        ))
+    
+    return questions
+
+def parse_numbered_format(text: str) -> List[Question]:
+    """Parse numbered format (1. 2. 3.)"""
+    questions = []
+    
+    # Split by numbered questions
+    question_parts = re.split(r'\n(\d+\.)\s*', text)
+    
+    for i in range(1, len(question_parts), 2):
+        if i + 1 < len(question_parts):
+            question_content = question_parts[i + 1]
+            
+            lines = [line for line in classify_lines(question_content) if line.kind != LINE_BLANK]
+            
+            if not lines:
+                continue
+                
+            question_text = lines[0].text
+            options = []
+            
+            # Look for options in subsequent lines
+            for line in lines[1:]:
+                if _is_option(line, uppercase_only=True):
+                    options.append(line.body)
+                    if len(options) >= 4:
+                        break
+            
+            if question_text and len(options) >= 2:
+                questions.append(Question(
+                    question_text=question_text,
+                    options=options,
+                    correct_answer=0
+                ))
+    
+    return questions
+
+def parse_enhanced_structured_format(text: str) -> List[Question]:
+    """Enhanced structured format parsing with better pattern recognition"""
+    questions = []
+    
+    # Try multiple patterns for structured format
+    patterns = [
+        r'\n\d+\nQuestion\n',  # Original pattern
+        r'\n\d+\.\s*Question\s*\n',  # Numbered with dots
+        r'\nQuestion\s*\d+\s*\n',  # Question with number
+        r'\n\d+\)\s*',  # Numbered with parentheses
+        r'\n\d+\s+[A-Z]',  # Numbered followed by text
+    ]
+    
+    for pattern in patterns:
+        question_blocks = re.split(pattern, text, flags=re.IGNORECASE)
+        if len(question_blocks) > 3:  # Need at least 3 blocks for meaningful extraction
+            for block in question_blocks[1:]:
+                question = extract_question_from_block(block)
+                if question:
+                    questions.append(question)
+            break
+    
+    # If no questions found with above patterns, try GST104 specific format
+    if not questions:
+        questions = parse_gst104_format(text)
+    
+    return questions
+
+def parse_gst104_format(text: str) -> List[Question]:
+    """Parse GST104 specific format"""
+    questions = []
+    
+    # Split by question numbers followed by "Question"
+    question_blocks = re.split(r'\n(\d+)\nQuestion\n', text)
+    
+    for i in range(1, len(question_blocks), 2):
+        if i + 1 < len(question_blocks):
+            question_num = question_blocks[i]
+            question_content = question_blocks[i + 1]
+            
+            try:
+                lines = [line for line in classify_lines(question_content) if line.kind != LINE_BLANK]
+                
+                # Find question text (after "Mark" line, before "Select one:")
+                question_text = ''
+                options = []
+                collecting_question = False
+                collecting_options = False
+                
+                for line in lines:
+                    if line.kind == LINE_METADATA and line.text.startswith('Mark'):
+                        collecting_question = True
+                        continue
+                    
+                    if line.kind == LINE_SELECT_ONE:
+                        collecting_question = False
+                        collecting_options = True
+                        continue
+                    
+                    if line.kind == LINE_NOISE:
+                        continue
+                    
+                    if collecting_question:
+                        question_text += line.text + ' '
+                    
+                    if collecting_options:
+                        # Stop collecting if we hit the next question or page info
+                        if line.kind == LINE_NUMBER or 'Question' in line.text:
+                            break
+                        if len(options) < 4:
+                            options.append(line.text)
+                
+                question_text = question_text.strip()
+                
+                if question_text and len(options) >= 2:
+                    questions.append(Question(
+                        question_text=question_text,
+                        options=options[:4],
+                        correct_answer=0  # Default to first option
+                    ))
+                    
+            except Exception as e:
+                continue
+    
+    return questions
+
+def parse_multiline_questions(text: str) -> List[Question]:
+    """Parse questions that span multiple lines with enhanced detection"""
+    questions = []
+    lines = classify_lines(text)
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        
+        if line.kind == LINE_QUESTION or 'question' in line.text.lower():
+            # Clean up question text
+            question_text = line.body if line.kind == LINE_QUESTION else line.text
+            
+            i += 1
+            # Continue collecting question text
+            while i < len(lines) and lines[i].kind != LINE_OPTION:
+                next_line = lines[i]
+                if next_line.kind not in (LINE_BLANK, LINE_SELECT_ONE, LINE_NOISE, LINE_QUESTION, LINE_NUMBER):
+                    question_text += ' ' + next_line.text
+                i += 1
+            
+            # Collect options (both uppercase and lowercase)
+            options = []
+            while i < len(lines) and lines[i].kind == LINE_OPTION:
+                option_text = lines[i].body
+                if option_text and len(option_text) > 2:  # Minimum length check
+                    options.append(option_text)
+                i += 1
+            
+            question_text = question_text.strip()
+            if question_text and len(question_text) > 10 and len(options) >= 2:
+                questions.append(Question(
+                    question_text=question_text,
+                    options=options[:4],
+                    correct_answer=0
+                ))
+        else:
+            i += 1
+    
+    return questions
+
+# Continuous text scanning
+#
+# Each pattern below matches a short, bounded token, and the text is walked
+# once, so scanning is linear in the text length however few options the
+# document contains.
+_OPTION_MARKER = re.compile(r'(?<!\S)([A-D])[.)]')
+_NUMBER_MARKER = re.compile(r'(?<!\S)\d+[.)]\s*')
+_OPTION_LETTERS = 'ABCD'
+MAX_OPTION_LENGTH = 300
+
+
+def _option_runs(text: str) -> List[List[re.Match]]:
+    """Group option markers into runs lettered A, B[, C[, D]] in one pass"""
+    runs = []
+    current = []
+    for marker in _OPTION_MARKER.finditer(text):
+        letter = marker.group(1)
+        if letter == 'A':
+            if len(current) >= 2:
+                runs.append(current)
+            current = [marker]
+        elif current and letter == _OPTION_LETTERS[len(current)]:
+            current.append(marker)
+            if len(current) == len(_OPTION_LETTERS):
+                runs.append(current)
+                current = []
+    if len(current) >= 2:
+        runs.append(current)
+    return runs
+
+
+def _split_stem(text: str, start: int, end: int) -> Tuple[int, int, bool]:
+    """Split text[start:end], the text before an A marker, into the tail of the
+    previous question's last option and the stem of the next question.
+
+    Returns (option_end, stem_start, numbered).
+    """
+    number = None
+    for number in _NUMBER_MARKER.finditer(text, start, end):
+        pass
+    if number:
+        return number.start(), number.end(), True
+
+    # Without a question number the stem starts after the last line break or
+    # sentence end, ignoring the stem's own closing punctuation.
+    body_end = start + len(text[start:end].rstrip()) - 1
+    cut = max(text.rfind(mark, start, body_end) for mark in '\n.!?')
+    stem_start = cut + 1 if cut >= 0 else start
+    newline = text.find('\n', start, stem_start)
+    return (newline if newline >= 0 else stem_start), stem_start, False
+
+
+def _is_question_stem(stem: str, numbered: bool) -> bool:
+    if len(stem) <= 15:
+        return False
+    return (
+        ('?' in stem and len(stem) >= 20)
+        or (numbered and len(stem) >= 30)
+        or 'which of the following' in stem.lower()
+    )
+
+
+def parse_continuous_text(text: str) -> List[Question]:
+    """Parse questions from continuous text where options follow the stem inline
+
+    Option markers are grouped into A-D runs; the stem of each question is the
+    text between the previous run and the run's A marker.
+    """
+    questions = []
+    runs = _option_runs(text)
+    
+    for index, run in enumerate(runs):
+        stem_from = runs[index - 1][-1].end() if index else 0
+        _, stem_start, numbered = _split_stem(text, stem_from, run[0].start())
+        question_text = ' '.join(text[stem_start:run[0].start()].split())
+        
+        # The last option runs to the next question's stem, the next line
+        # break or MAX_OPTION_LENGTH, whichever comes first
+        if index + 1 < len(runs):
+            last_end, _, _ = _split_stem(text, run[-1].end(), runs[index + 1][0].start())
+        else:
+            last_end = text.find('\n', run[-1].end())
+            last_end = len(text) if last_end < 0 else last_end
+        last_end = min(last_end, run[-1].end() + MAX_OPTION_LENGTH)
+        
+        bounds = [marker.end() for marker in run]
+        ends = [marker.start() for marker in run[1:]] + [last_end]
+        options = [' '.join(text[b:e].split()) for b, e in zip(bounds, ends)]
+        options = [opt for opt in options if len(opt) > 3]
+        
+        if _is_question_stem(question_text, numbered) and len(options) >= 2:
+            questions.append(Question(
+                question_text=question_text,
+                options=options[:4],
+                correct_answer=0
+            ))
+    
+    return questions
+
+def parse_page_by_page(pages: List[str]) -> List[Question]:
+    """Parse questions page by page with comprehensive methods"""
+    questions = []
+    
+    for page_num, page_text in enumerate(pages):
+        if not page_text:
+            continue
+        
+        # Clean page text
+        page_text = re.sub(r'http://[^\s]*', '', page_text)  # Remove URLs
+        page_text = re.sub(r'\d+/\d+/\d+', '', page_text)   # Remove dates
+        
+        page_questions = []
+        
+        # Method 1: Numbered questions
+        numbered_pattern = r'\n(\d+)[\.\)]\s*([^0-9\n][^\n]*)'
+        numbered_matches = re.findall(numbered_pattern, page_text)
+        
+        for match in numbered_matches:
+            question_num = match[0]
+            question_start = match[1]
+            
+            # Find the full question and options
+            question_block = extract_full_question_block(page_text, question_num, question_start)
+            if question_block:
+                parsed_question = parse_question_block(question_block)
+                if parsed_question:
+                    page_questions.append(parsed_question)
+        
+        # Method 2: Look for Q: patterns
+        q_pattern = r'Q\d*[\.\:]?\s*([^A-D\n]{20,}?)([A-D][\.\)][^A-D]*)'
+        q_matches = re.finditer(q_pattern, page_text, re.IGNORECASE | re.DOTALL)
+        
+        for match in q_matches:
+            question_text = match.group(1).strip()
+            options_start = match.group(2)
+            
+            # Extract full options
+            options = extract_options_from_position(page_text, match.end() - len(options_start))
+            
+            if question_text and len(question_text) > 10 and len(options) >= 2:
+                page_questions.append(Question(
+                    question_text=question_text,
+                    options=options,
+                    correct_answer=0
+                ))
+        
+        questions.extend(page_questions)
+    
+    return questions
+
+def extract_full_question_block(text: str, question_num: str, question_start: str) -> str:
+    """Extract the full question block including all options"""
+    # Find where this question starts
+    start_pattern = f"{question_num}[\\.)\\s]+{re.escape(question_start[:20])}"
+    start_match = re.search(start_pattern, text)
+    
+    if not start_match:
+        return ""
+    
+    start_pos = start_match.start()
+    
+    # Find where the next question starts
+    next_q_pattern = f"\\n{int(question_num) + 1}[\\.)\\s]+"
+    next_match = re.search(next_q_pattern, text[start_pos + 10:])
+    
+    if next_match:
+        end_pos = start_pos + 10 + next_match.start()
+        return text[start_pos:end_pos]
+    else:
+        # If no next question, take a reasonable chunk
+        return text[start_pos:start_pos + 500]
+
+def parse_question_block(block: str) -> Optional[Question]:
+    """Parse a complete question block"""
+    lines = [line for line in classify_lines(block) if line.kind != LINE_BLANK]
+    
+    if not lines:
+        return None
+    
+    # Extract question text (everything before first option)
+    question_lines = []
+    options = []
+    
+    for line in lines:
+        if line.kind == LINE_OPTION:
+            # This is an option
+            if line.body and len(line.body) > 2:
+                options.append(line.body)
+        elif not options:  # Still collecting question text
+            # Clean the line
+            cleaned = line.body if line.kind == LINE_QUESTION else line.text
+            if cleaned and line.kind not in (LINE_METADATA, LINE_NOISE):
+                question_lines.append(cleaned)
+    
+    question_text = ' '.join(question_lines).strip()
+    
+    if question_text and len(question_text) > 10 and len(options) >= 2:
+        return Question(
+            question_text=question_text,
+            options=options[:4],
+            correct_answer=0
+        )
+    
+    return None
+
+def extract_options_from_position(text: str, start_pos: int) -> List[str]:
+    """Extract options starting from a specific position"""
+    options = []
+    remaining_text = text[start_pos:]
+    
+    # Look for A. B. C. D. patterns
+    option_pattern = r'([A-D])[\.\)]([^A-D]*?)(?=[A-D][\.\)]|$)'
+    matches = re.findall(option_pattern, remaining_text[:500])  # Limit search range
+    
+    for match in matches:
+        option_text = match[1].strip()
+        if option_text and len(option_text) > 2:
+            options.append(option_text)
+    
+    return options[:4]
+
+def extract_question_from_block(block: str) -> Optional[Question]:
+    """Extract a single question from a text block"""
+    lines = [line for line in classify_lines(block) if line.kind != LINE_BLANK]
+    
+    if not lines:
+        return None
+    
+    question_text = ''
+    options = []
+    collecting_question = True
+    
+    for line in lines:
+        # Skip metadata lines
+        if line.kind in (LINE_METADATA, LINE_NOISE):
+            continue
+        
+        # Check for option markers
+        if _is_option(line, uppercase_only=True):
+            collecting_question = False
+            if line.body:
+                options.append(line.body)
+        elif collecting_question and line.kind != LINE_SELECT_ONE:
+            question_text += line.text + ' '
+    
+    question_text = question_text.strip()
+    
+    if question_text and len(options) >= 2:
+        return Question(
+            question_text=question_text,
+            options=options[:4],
+            correct_answer=0
+        )
+    
+    return None
@@ -0,0 +1,140 @@
+# app/preflight.py
+"""
+Pre-flight check of a PDF's text layer.
+
+Scanned question papers are pictures of pages with no text layer, and no
+amount of layout analysis or parsing turns them into questions. Before the
+full extraction, check_text_layer() measures how much text each page draws
+by reading the string operands of the text-showing operators (Tj, TJ, ' and
+") straight from the page's content streams and the forms they use. That
+needs no font decoding or layout work, so even long documents are checked in
+tens of milliseconds.
+
+A document where no page draws text is rejected; one where only some pages
+do is parsed as usual, and the pages without text are reported on the job.
+
+Configured through the environment:
+    PDF_PREFLIGHT_MIN_PAGE_BYTES  text bytes below which a page counts as
+                                  having no text layer (default: 20)
+"""
+import logging
+import os
+import re
+from typing import List, NamedTuple, Optional
+
+from PyPDF2.generic import ArrayObject
+
+from app.limits import check_page_count
+from app.pdf_parser import PdfSource, open_pdf_fast
+
+logger = logging.getLogger(__name__)
+
+# A page number or running header alone does not make a text layer
+MIN_PAGE_TEXT_BYTES = int(os.environ.get("PDF_PREFLIGHT_MIN_PAGE_BYTES", 20))
+# Forms can draw other forms; stop following them this deep
+MAX_FORM_DEPTH = 3
+
+# The operand of a text-showing operator: a literal string, a hex string, or
+# a TJ array of both
+_TEXT_SHOW = re.compile(rb'(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|\[(?:\\.|[^\]\\])*\])\s*(?:Tj|TJ|\'|")')
+_STRING = re.compile(rb'\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>')
+_WHITESPACE = re.compile(rb'\s')
+
+
+class TextLayerReport(NamedTuple):
+    pages: int
+    pages_without_text: List[int]  # 1-based
+    text_bytes: int
+
+    def rejection(self) -> Optional[str]:
+        """Why the document cannot yield questions, or None if it can be parsed"""
+        if self.pages and len(self.pages_without_text) == self.pages:
+            return "PDF has no text layer (scanned or image-only pages); upload a text PDF or run OCR on it first"
+        return None
+
+
+def page_ranges(pages: List[int]) -> str:
+    """'1-3, 7, 9-10' for [1, 2, 3, 7, 9, 10]"""
+    ranges = []
+    for page in pages:
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def _operand_bytes(data: bytes) -> int:
+    total = 0
+    for show in _TEXT_SHOW.finditer(data):
+        for string in _STRING.findall(show.group(1)):
+            if string.startswith(b'<'):
+                total += len(_WHITESPACE.sub(b'', string[1:-1])) // 2
+            else:
+                total += len(string) - 2
+    return total
+
+
+def _streams(contents) -> list:
+    if contents is None:
+        return []
+    contents = contents.get_object()
+    if isinstance(contents, ArrayObject):
+        return [stream.get_object() for stream in contents]
+    return [contents]
+
+
+def _form_bytes(resources, seen: dict, depth: int) -> int:
+    """Text bytes drawn by the form XObjects of a resource dictionary"""
+    if resources is None or depth > MAX_FORM_DEPTH:
+        return 0
+    xobjects = resources.get_object().get('/XObject')
+    if xobjects is None:
+        return 0
+    total = 0
+    for reference in xobjects.get_object().values():
+        key = getattr(reference, 'idnum', None)
+        if key in seen:
+            total += seen[key]
+            continue
+        xobject = reference.get_object()
+        count = 0
+        if xobject.get('/Subtype') == '/Form':
+            count = _operand_bytes(xobject.get_data()) + _form_bytes(xobject.get('/Resources'), seen, depth + 1)
+        if key is not None:
+            seen[key] = count
+        total += count
+    return total
+
+
+def page_text_bytes(page, seen: Optional[dict] = None) -> int:
+    """Bytes of text a PyPDF2 page draws, directly or through forms
+
+    Counts string bytes, not characters: CID fonts use two bytes per glyph.
+    ``seen`` caches forms shared by several pages.
+    """
+    seen = {} if seen is None else seen
+    total = sum(_operand_bytes(stream.get_data()) for stream in _streams(page.get('/Contents')))
+    return total + _form_bytes(page.get('/Resources'), seen, 1)
+
+
+def check_text_layer(pdf_source: PdfSource) -> Optional[TextLayerReport]:
+    """Measure the text layer of every page; None if PyPDF2 cannot read the PDF
+
+    Raises ResourceLimitExceeded for PDFs over the page limit.
+    """
+    try:
+        with open_pdf_fast(pdf_source) as reader:
+            total_pages = len(reader.pages)
+            check_page_count(total_pages)
+            seen: dict = {}
+            per_page = [page_text_bytes(page, seen) for page in reader.pages]
+    except Exception:
+        # Leave the verdict to the full extraction, which may cope
+        logger.warning("Pre-flight check could not read the PDF", exc_info=True)
+        return None
+    return TextLayerReport(
+        pages=total_pages,
+        pages_without_text=[index + 1 for index, count in enumerate(per_page) if count < MIN_PAGE_TEXT_BYTES],
+        text_bytes=sum(per_page),
+    )
@@ -0,0 +1,95 @@
+# app/question_store.py
+"""
+Course questions, one document per question in the ``questions`` collection.
+
+Each document holds the Question fields plus the ``course_id`` it belongs to
+and an ``ordinal`` that orders it within the course. Ordinals are written
+ORDINAL_GAP apart, so a re-import (see app/reimport.py) can put a new or
+moved question between two others without renumbering the rest; only their
+order means anything. (course_id, id) is unique, so editing one question is a single-document update, and
+(course_id, ordinal) serves the ordered loads; both indexes are declared in
+app/indexes.py. Course documents keep ``total_questions`` but no longer embed
+the questions themselves, which kept large courses close to MongoDB's 16 MB
+document limit; app/migrate_questions.py moves courses stored the old way.
+
+Helpers that only build queries or documents work with pymongo and Motor
+alike: find_questions() returns a cursor to iterate or ``to_list``.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from pymongo import ASCENDING, DeleteMany, InsertOne
+
+from app.models import Course, Question
+
+ORDINAL_GAP = 1024
+
+
+def spaced_ordinals(count: int) -> range:
+    return range(0, count * ORDINAL_GAP, ORDINAL_GAP)
+
+
+def question_documents(
+    course_id: str,
+    questions: Iterable[Union[Question, Dict[str, Any]]],
+    ordinals: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Stored form of a course's questions, in order
+
+    ``ordinals`` defaults to evenly spaced ones.
+    """
+    questions = list(questions)
+    if ordinals is None:
+        ordinals = spaced_ordinals(len(questions))
+    return [
+        {**(question.dict() if isinstance(question, Question) else question), "course_id": course_id, "ordinal": ordinal}
+        for ordinal, question in zip(ordinals, questions)
+    ]
+
+
+def course_document(course: Course) -> Dict[str, Any]:
+    """Stored form of a course, without its questions"""
+    return course.dict(exclude={"questions"})
+
+
+def replace_operations(course_id: str, questions) -> list:
+    """bulk_write operations that make ``questions`` the course's only questions"""
+    return [DeleteMany({"course_id": course_id})] + [
+        InsertOne(document) for document in question_documents(course_id, questions)
+    ]
+
+
+def find_questions(db, course_id: str, fields: Optional[List[str]] = None, with_ordinals: bool = False):
+    """Cursor over a course's questions in order, as Question-shaped dicts
+
+    ``fields`` limits the returned fields, e.g. to leave out correct_answer;
+    ``with_ordinals`` keeps the stored ordinal, which re-imports need.
+    """
+    if fields:
+        projection = {"_id": 0, **{field: 1 for field in fields}}
+    elif with_ordinals:
+        projection = {"_id": 0, "course_id": 0}
+    else:
+        projection = {"_id": 0, "course_id": 0, "ordinal": 0}
+    return db.questions.find({"course_id": course_id}, projection).sort("ordinal", ASCENDING)
+
+
+async def load_questions(
+    db, course_id: str, fields: Optional[List[str]] = None, with_ordinals: bool = False
+) -> List[Dict[str, Any]]:
+    return await find_questions(db, course_id, fields, with_ordinals).to_list(None)
+
+
+async def attach_questions(db, courses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fill in the ``questions`` of several course documents with one query"""
+    by_course: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    cursor = db.questions.find(
+        {"course_id": {"$in": [course["id"] for course in courses]}}, {"_id": 0}
+    ).sort([("course_id", ASCENDING), ("ordinal", ASCENDING)])
+    async for question in cursor:
+        course_id = question.pop("course_id")
+        question.pop("ordinal", None)
+        by_course[course_id].append(question)
+    for course in courses:
+        course["questions"] = by_course.get(course["id"], [])
+    return courses
@@ -0,0 +1,192 @@
+# app/reimport.py
+"""
+Re-importing a course's questions without replacing the course.
+
+diff_questions() matches freshly parsed questions to the course's existing
+ones by a hash of their normalized stem (see app/dedup.py), so a question
+keeps its id, and with it every test attempt answer recorded against it,
+for as long as its text survives. Matched questions keep the admin-set
+correct_answer; when their options changed, the answer follows the option
+text to its new position if it is still there.
+
+Matched questions keep their stored ordinal wherever the order allows it:
+the longest run of them still in their old relative order stays put, and
+added or reordered questions take free ordinals between their neighbours
+(see ORDINAL_GAP in app/question_store.py). Only when two neighbours leave
+no room is the whole course renumbered.
+
+update_operations() turns the diff into writes to the ``questions``
+collection: one delete for the removed questions, an update per changed
+question or question that had to move, and an insert per added one, so
+removing or adding a question touches that question alone. The operations work with pymongo and
+Motor bulk_write alike. They are not applied atomically, but running the
+same re-import again converges on the same result.
+"""
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import DeleteMany, InsertOne, UpdateOne
+
+from app.dedup import normalize_text
+from app.models import Question
+from app.question_store import ORDINAL_GAP, question_documents, spaced_ordinals
+
+
+class QuestionDiff(NamedTuple):
+    questions: List[Dict[str, Any]]  # the course's new question list, in order
+    added: List[int]  # indexes into questions
+    changed: List[int]
+    removed: List[str]  # ids of existing questions no longer parsed
+    answers_reset: List[str]  # ids of changed questions whose answer could not be carried over
+    moved: List[int]  # indexes of unchanged questions whose ordinal changed
+    ordinals: List[int]  # stored ordinal of each question
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": len(self.questions) - len(self.added) - len(self.changed),
+            "answers_reset": len(self.answers_reset),
+        }
+
+
+def question_key(question_text: str) -> str:
+    return hashlib.sha1(normalize_text(question_text).encode("utf-8")).hexdigest()
+
+
+def _options_key(options: List[str]) -> Tuple[str, ...]:
+    return tuple(normalize_text(option) for option in options)
+
+
+def _carry_answer(previous: Dict[str, Any], options: List[str]):
+    """Index of the previously correct option among the new options, or None"""
+    try:
+        correct = normalize_text(previous["options"][previous["correct_answer"]])
+    except (IndexError, TypeError):
+        return None
+    new_options = _options_key(options)
+    return new_options.index(correct) if correct in new_options else None
+
+
+def _kept_in_order(previous: List[Optional[int]]) -> List[int]:
+    """Indexes of the longest run of matched questions whose old ordinals still increase"""
+    tails: List[int] = []  # old ordinal ending the best run of each length
+    tail_index: List[int] = []
+    before: Dict[int, Optional[int]] = {}
+    for index, ordinal in enumerate(previous):
+        if ordinal is None:
+            continue
+        length = bisect.bisect_left(tails, ordinal)
+        before[index] = tail_index[length - 1] if length else None
+        if length == len(tails):
+            tails.append(ordinal)
+            tail_index.append(index)
+        else:
+            tails[length] = ordinal
+            tail_index[length] = index
+    kept = []
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        kept.append(index)
+        index = before[index]
+    return kept[::-1]
+
+
+def _place(previous: List[Optional[int]]) -> Optional[List[int]]:
+    """Ordinals for the new order that keep as many old ones as possible
+
+    None if some questions do not fit between their neighbours.
+    """
+    kept = _kept_in_order(previous)
+    ordinals: List[Optional[int]] = [None] * len(previous)
+    for index in kept:
+        ordinals[index] = previous[index]
+    anchors = [-1] + kept + [len(previous)]
+    for left, right in zip(anchors, anchors[1:]):
+        count = right - left - 1
+        if not count:
+            continue
+        if left >= 0 and right < len(previous):
+            low, high = ordinals[left], ordinals[right]
+        elif left >= 0:
+            low, high = ordinals[left], ordinals[left] + (count + 1) * ORDINAL_GAP
+        elif right < len(previous):
+            low, high = ordinals[right] - (count + 1) * ORDINAL_GAP, ordinals[right]
+        else:
+            low, high = -ORDINAL_GAP, count * ORDINAL_GAP
+        if high - low <= count:
+            return None
+        for offset in range(1, count + 1):
+            ordinals[left + offset] = low + (high - low) * offset // (count + 1)
+    return ordinals
+
+
+def diff_questions(existing: List[Dict[str, Any]], parsed: List[Question]) -> QuestionDiff:
+    """Match parsed questions to a course's existing questions by normalized stem
+
+    ``existing`` is the course's questions in order with their ordinals, as
+    loaded by question_store.find_questions(..., with_ordinals=True).
+
+    Several existing questions may share a stem ("Which of the following is
+    not ..."); a parsed question then takes the one with the same options if
+    there is one, else the first not yet taken.
+    """
+    by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for question in existing:
+        by_key[question_key(question["question_text"])].append(question)
+
+    questions, added, changed, answers_reset = [], [], [], []
+    matched_order = []
+    for index, question in enumerate(parsed):
+        new = question.dict()
+        candidates = by_key.get(question_key(new["question_text"]))
+        if not candidates:
+            added.append(index)
+            questions.append(new)
+            continue
+        options_key = _options_key(new["options"])
+        previous = next((q for q in candidates if _options_key(q["options"]) == options_key), candidates[0])
+        candidates.remove(previous)
+        matched_order.append(previous["id"])
+
+        merged = {**new, "id": previous["id"], "correct_answer": previous["correct_answer"]}
+        if _options_key(previous["options"]) != options_key:
+            answer = _carry_answer(previous, new["options"])
+            if answer is None:
+                answers_reset.append(previous["id"])
+                answer = new["correct_answer"]
+            merged["correct_answer"] = answer
+        if any(previous.get(field) != value for field, value in merged.items()):
+            changed.append(index)
+        questions.append(merged)
+
+    matched = set(matched_order)
+    removed = [question["id"] for question in existing if question["id"] not in matched]
+    old_ordinals = {question["id"]: question["ordinal"] for question in existing}
+    new = set(added)
+    previous = [None if index in new else old_ordinals[question["id"]] for index, question in enumerate(questions)]
+    ordinals = _place(previous) or list(spaced_ordinals(len(questions)))
+    unchanged = set(range(len(questions))) - new - set(changed)
+    moved = [index for index in sorted(unchanged) if previous[index] != ordinals[index]]
+    return QuestionDiff(questions, added, changed, removed, answers_reset, moved, ordinals)
+
+
+def update_operations(course_id: str, diff: QuestionDiff) -> list:
+    """Writes to the questions collection that bring the course in line with the diff
+
+    The caller updates the course's ``total_questions`` and any other course
+    fields itself.
+    """
+    documents = question_documents(course_id, diff.questions, diff.ordinals)
+    operations = []
+    if diff.removed:
+        operations.append(DeleteMany({"course_id": course_id, "id": {"$in": diff.removed}}))
+    for index in diff.changed:
+        operations.append(UpdateOne({"course_id": course_id, "id": documents[index]["id"]}, {"$set": documents[index]}))
+    for index in diff.moved:
+        operations.append(UpdateOne({"course_id": course_id, "id": documents[index]["id"]}, {"$set": {"ordinal": diff.ordinals[index]}}))
+    operations += [InsertOne(documents[index]) for index in diff.added]
+    return operations
@@ -0,0 +1,52 @@
+# app/single_flight.py
+"""
+Coalescing of identical concurrent lookups within one process.
+
+When an exam opens, hundreds of students fetch and submit the same course
+within a second, and each request would send the same course query to
+MongoDB. A SingleFlight runs one load per key at a time: callers that ask
+for a key whose load is already in flight wait for that load and share its
+result (or its exception) instead of starting their own.
+
+Shared results are the same object for every caller, so they must be
+treated as read-only. A caller that joins a load may get data read a few
+milliseconds before it asked; loads that must observe a write made by the
+same request should not go through a SingleFlight.
+
+Each load runs as its own task, so a caller that is cancelled (a client
+disconnecting) does not cancel the load for the others. Loads and coalesced
+calls are counted in the metrics registry as
+``single_flight{flight=...,result=loaded|coalesced}``.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``load()``, shared with concurrent callers using the same key"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            metrics.inc("single_flight", flight=self.name, result="loaded")
+        else:
+            metrics.inc("single_flight", flight=self.name, result="coalesced")
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
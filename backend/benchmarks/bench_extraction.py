@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark sequential against parallel PDF text extraction.
+
+Builds PDFs of increasing page count by repeating the pages of GST104.pdf,
+then times extract_document() with one worker and with N workers.
+
+    cd backend && python -m benchmarks.bench_extraction --workers 4 --pages 28 112 300
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PyPDF2 import PdfReader, PdfWriter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import pdf_parser  # noqa: E402
+from app.pdf_parser import extract_document  # noqa: E402
+
+SAMPLE_PDF = Path(__file__).resolve().parent.parent.parent / "GST104.pdf"
+
+
+def tile_pdf(source: bytes, page_count: int) -> bytes:
+    """Repeat the pages of source until the document has page_count pages"""
+    reader = PdfReader(BytesIO(source))
+    writer = PdfWriter()
+    for i in range(page_count):
+        writer.add_page(reader.pages[i % len(reader.pages)])
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def time_extraction(pdf_content: bytes, workers: int) -> float:
+    started = time.perf_counter()
+    extract_document(pdf_content, workers=workers)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages", type=int, nargs="+", default=[28, 112, 300])
+    parser.add_argument("--pdf", type=Path, default=SAMPLE_PDF)
+    args = parser.parse_args()
+
+    source = args.pdf.read_bytes()
+    # Take the parallel path at every size so small documents are measured too
+    pdf_parser.PARALLEL_MIN_PAGES = 0
+    # Warm the worker pool so process start-up is not charged to the first size
+    extract_document(tile_pdf(source, 1), workers=args.workers)
+
+    print(f"{'pages':>6} {'1 worker':>10} {f'{args.workers} workers':>12} {'speed-up':>9}")
+    for page_count in args.pages:
+        pdf_content = tile_pdf(source, page_count)
+        sequential = time_extraction(pdf_content, 1)
+        parallel = time_extraction(pdf_content, args.workers)
+        print(f"{page_count:>6} {sequential:>9.2f}s {parallel:>11.2f}s {sequential / parallel:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
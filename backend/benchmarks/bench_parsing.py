@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Offline parser benchmark and accuracy check.
+
+Runs the full parse pipeline and every registered parser over GST104.pdf and
+over synthetic PDFs in each supported format (see benchmarks/synthetic.py),
+and reports per document and method: pages/sec, questions/sec, peak RSS, and
+precision/recall against the document's golden question set, plus the time
+each extraction backend takes and which one the pipeline kept. Each document
+is measured in a fresh process so peak memory is not inherited.
+
+Results are saved to benchmarks/results/ under the current commit and
+compared with the previous run (or --baseline), flagging methods that got
+slower or less accurate.
+
+    cd backend && python -m benchmarks.bench_parsing
+    cd backend && python -m benchmarks.bench_parsing --pages 300 --formats moodle continuous
+    cd backend && python -m benchmarks.bench_parsing --baseline benchmarks/results/<run>.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.dedup import normalize_text  # noqa: E402
+from app.limits import MemoryWatch  # noqa: E402
+from app.pdf_parser import (  # noqa: E402
+    BACKEND_PDFPLUMBER,
+    BACKEND_PYPDF2,
+    PARSER_VERSION,
+    PARSERS,
+    extract_and_parse,
+    extract_document,
+    extract_document_fast,
+)
+from benchmarks import synthetic  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+SAMPLE_PDF = BENCH_DIR.parent.parent / "GST104.pdf"
+GOLDEN_DIR = BENCH_DIR / "golden"
+RESULTS_DIR = BENCH_DIR / "results"
+
+PIPELINE = "pipeline"
+# Flag a method whose throughput fell by more than this share, or whose
+# precision or recall fell by more than ACCURACY_TOLERANCE
+SLOWDOWN_TOLERANCE = 0.15
+ACCURACY_TOLERANCE = 0.005
+
+
+def _question_key(question_text: str, options: List[str]):
+    return normalize_text(question_text), tuple(normalize_text(option) for option in options)
+
+
+def score(found: List[Dict[str, Any]], golden: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Precision and recall of found questions; a match needs the stem and every option"""
+    expected = Counter(_question_key(q["question_text"], q["options"]) for q in golden)
+    actual = Counter(_question_key(q["question_text"], q["options"]) for q in found)
+    matched = sum((expected & actual).values())
+    return {
+        "matched": matched,
+        "precision": round(matched / len(found), 4) if found else 0.0,
+        "recall": round(matched / len(golden), 4) if golden else 0.0,
+    }
+
+
+def _timed(func, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_case(case: Dict[str, Any], repeat: int = 1) -> Dict[str, Any]:
+    """Measure one document. Runs in a fresh benchmark process."""
+    with tempfile.TemporaryDirectory() as workdir:
+        if case.get("format"):
+            pdf_content, golden = synthetic.generate(case["format"], case["pages"], case.get("seed", 0))
+            pdf_path = Path(workdir) / f"{case['name']}.pdf"
+            pdf_path.write_bytes(pdf_content)
+            del pdf_content
+        else:
+            pdf_path = Path(case["pdf"])
+            golden = json.loads(Path(case["golden"]).read_text())
+
+        memory = MemoryWatch(limit_mb=0)
+
+        def on_page(pages_done: int, pages_total: int):
+            memory.check()
+
+        extraction = {}
+        extraction[BACKEND_PYPDF2], _ = _timed(lambda: extract_document_fast(str(pdf_path), on_page), repeat)
+        extraction[BACKEND_PDFPLUMBER], document = _timed(lambda: extract_document(str(pdf_path), on_page), repeat)
+        # The pipeline extracts too, as an upload does, and may fall back
+        pipeline_seconds, outcome = _timed(lambda: extract_and_parse(str(pdf_path), on_page), repeat)
+
+    page_count = len(document.pages)
+
+    def measured(seconds: float, questions) -> Dict[str, Any]:
+        return {
+            "seconds": round(seconds, 4),
+            "questions": len(questions),
+            "pages_per_sec": round(page_count / seconds, 1) if seconds else None,
+            "questions_per_sec": round(len(questions) / seconds, 1) if seconds else None,
+            **score([q.dict() for q in questions], golden),
+        }
+
+    results = {PIPELINE: measured(pipeline_seconds, outcome.questions)}
+    # Single parsers are timed over the already extracted pdfplumber text
+    for parser in PARSERS:
+        parse_seconds, questions = _timed(lambda: parser.parse(document), repeat)
+        memory.check()
+        results[parser.name] = measured(parse_seconds, questions)
+
+    return {
+        "name": case["name"],
+        "pages": page_count,
+        "golden_questions": len(golden),
+        "extract_seconds": round(extraction[BACKEND_PDFPLUMBER], 4),
+        "backend_seconds": {backend: round(seconds, 4) for backend, seconds in extraction.items()},
+        "pipeline_backend": outcome.backend,
+        "peak_rss_mb": round(memory.peak_mb, 1),
+        "methods": results,
+    }
+
+
+def _git_revision() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=BENCH_DIR
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--", str(BENCH_DIR.parent / "app")],
+            capture_output=True, text=True, check=True, cwd=BENCH_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def _latest_results(exclude: Optional[Path] = None) -> Optional[Path]:
+    runs = sorted(path for path in RESULTS_DIR.glob("*.json") if path != exclude)
+    return runs[-1] if runs else None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable regressions of current against baseline"""
+    previous_cases = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        previous = previous_cases.get(case["name"])
+        if not previous or previous["pages"] != case["pages"]:
+            continue
+        for method, now in case["methods"].items():
+            before = previous["methods"].get(method)
+            if not before:
+                continue
+            if before["pages_per_sec"] and now["pages_per_sec"] < before["pages_per_sec"] * (1 - SLOWDOWN_TOLERANCE):
+                regressions.append(
+                    f"{case['name']}/{method}: {before['pages_per_sec']} -> {now['pages_per_sec']} pages/sec"
+                )
+            for metric in ("precision", "recall"):
+                if now[metric] < before[metric] - ACCURACY_TOLERANCE:
+                    regressions.append(f"{case['name']}/{method}: {metric} {before[metric]} -> {now[metric]}")
+    return regressions
+
+
+def print_report(run: Dict[str, Any]):
+    print(f"parser version {run['parser_version']} at {run['revision']}")
+    header = f"{'document':<22} {'method':<20} {'pages/s':>8} {'q/s':>8} {'found':>6} {'prec':>6} {'recall':>6}"
+    for case in run["cases"]:
+        print()
+        print(f"{case['name']}: {case['pages']} pages, {case['golden_questions']} golden questions, "
+              f"extraction {case['extract_seconds']:.2f}s, peak RSS {case['peak_rss_mb']} MB")
+        backends = case.get("backend_seconds", {})
+        if backends:
+            print("extraction " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in backends.items())
+                  + f"; pipeline used {case['pipeline_backend']}")
+        print(header)
+        for method, result in case["methods"].items():
+            print(f"{case['name']:<22} {method:<20} {result['pages_per_sec']:>8} {result['questions_per_sec']:>8} "
+                  f"{result['questions']:>6} {result['precision']:>6.3f} {result['recall']:>6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="pages per synthetic PDF")
+    parser.add_argument("--formats", nargs="+", choices=sorted(synthetic.FORMATS), default=sorted(synthetic.FORMATS))
+    parser.add_argument("--no-sample", action="store_true", help="skip GST104.pdf")
+    parser.add_argument("--repeat", type=int, default=1, help="time each step this many times and keep the best")
+    parser.add_argument("--baseline", type=Path, help="results file to compare with (default: the previous run)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    cases = []
+    if not args.no_sample:
+        cases.append({"name": "GST104", "pdf": str(SAMPLE_PDF), "golden": str(GOLDEN_DIR / "GST104.json")})
+    cases += [
+        {"name": f"synthetic-{name}", "format": name, "pages": args.pages, "seed": 0}
+        for name in args.formats
+    ]
+
+    # One fresh process per document, so each peak RSS figure is its own
+    context = multiprocessing.get_context("spawn")
+    measured = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            measured.append(executor.submit(run_case, case, args.repeat).result())
+
+    run = {
+        "revision": _git_revision(),
+        "parser_version": PARSER_VERSION,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "cases": measured,
+    }
+    print_report(run)
+
+    saved = None
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        saved = RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{run['revision']}.json"
+        saved.write_text(json.dumps(run, indent=2) + "\n")
+        print(f"\nSaved {saved.relative_to(BENCH_DIR.parent)}")
+
+    baseline_path = args.baseline or _latest_results(exclude=saved)
+    if baseline_path:
+        regressions = compare(run, json.loads(baseline_path.read_text()))
+        print(f"\nCompared with {baseline_path.name}: {len(regressions) or 'no'} regressions")
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
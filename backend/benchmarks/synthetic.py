@@ -0,0 +1,189 @@
+"""
+Synthetic question PDFs for the parser benchmarks.
+
+build_pdf() is a minimal PDF writer (Helvetica text, one content stream per
+page) so the corpus needs nothing beyond the standard library, and the
+generate_* functions lay out seeded random questions in each format the
+parsers support. Every generator returns the PDF together with the questions
+it contains, which serve as that document's golden set.
+"""
+import random
+import textwrap
+from typing import Callable, Dict, List, Tuple
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 40
+FONT_SIZE = 9
+LEADING = 11
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+WRAP_WIDTH = 100
+
+GoldenQuestion = Dict[str, object]  # {"question_text": str, "options": [str]}
+
+_WORDS = (
+    "library catalogue index archive journal abstract citation reference "
+    "research method sample survey theory model variable hypothesis data "
+    "analysis source record report review author title edition volume series "
+    "subject classification retrieval database network system service user "
+    "reader collection manuscript thesis article periodical bibliography "
+    "document format storage access policy budget staff training program "
+    "literacy skill inquiry evidence argument conclusion context region "
+    "history economy culture society language science policy health market"
+).split()
+
+_STEMS = [
+    "Which of the following best describes the {0} of a {1} {2}?",
+    "What is the main purpose of {0} {1} in a {2}?",
+    "Which of the following is not a {0} of {1} {2}?",
+    "The {0} {1} is most useful for which {2}?",
+    "Why is the {0} of {1} important when preparing a {2}?",
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Write a PDF with one page per list of text lines"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, written once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        commands = [f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        commands += [f"({_escape(line)}) Tj T*" for line in lines]
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(page_refs))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def random_questions(count: int, seed: int = 0) -> List[GoldenQuestion]:
+    rng = random.Random(seed)
+    questions = []
+    for number in range(count):
+        stem = rng.choice(_STEMS).format(*rng.sample(_WORDS, 3))
+        # A serial keeps every stem distinct, as in a real question bank
+        stem = stem.replace("?", f" in unit {number + 1}?")
+        options = [" ".join(rng.sample(_WORDS, rng.randint(2, 5))) for _ in range(4)]
+        questions.append({"question_text": stem, "options": options})
+    return questions
+
+
+def _paginate(blocks: List[List[str]], header: Callable[[int], List[str]] = None,
+              footer: Callable[[int], List[str]] = None) -> List[List[str]]:
+    """Flow blocks of lines onto pages without splitting a block"""
+    pages: List[List[str]] = []
+    current: List[str] = []
+    budget = LINES_PER_PAGE - len(header(0) if header else []) - len(footer(0) if footer else [])
+
+    def close():
+        number = len(pages) + 1
+        pages.append((header(number) if header else []) + current + (footer(number) if footer else []))
+
+    for block in blocks:
+        if current and len(current) + len(block) > budget:
+            close()
+            current = []
+        current.extend(block)
+    if current:
+        close()
+    return pages
+
+
+def moodle_pages(questions: List[GoldenQuestion]) -> List[List[str]]:
+    """Moodle quiz review export, like GST104.pdf"""
+    blocks = [[
+        "Started on Monday, 22 April 2019, 12:38 AM",
+        "Completed on Monday, 22 April 2019, 1:06 AM",
+        f"Grade {len(questions)}.00 out of {len(questions)}.00 (100%)",
+    ]]
+    for number, question in enumerate(questions, 1):
+        blocks.append(
+            [str(number), "Question", "Complete", "Mark 1.00 out of 1.00"]
+            + textwrap.wrap(question["question_text"], WRAP_WIDTH)
+            + ["Select one:"] + question["options"]
+        )
+    return _paginate(
+        blocks,
+        header=lambda page: ["4/22/2019 SYNTHETIC EXAM"],
+        footer=lambda page: [f"http://localhost/moodle/mod/quiz/review.php?attempt=1&showall=1 {page}"],
+    )
+
+
+def multiline_pages(questions: List[GoldenQuestion]) -> List[List[str]]:
+    """Q1. prefixed stems with one lettered option per line"""
+    return _paginate([
+        textwrap.wrap(f"Q{number}. {question['question_text']}", WRAP_WIDTH)
+        + [f"{letter}. {option}" for letter, option in zip("ABCD", question["options"])]
+        + [""]
+        for number, question in enumerate(questions, 1)
+    ])
+
+
+def numbered_pages(questions: List[GoldenQuestion]) -> List[List[str]]:
+    """1. numbered stems with A) options on their own lines"""
+    return _paginate([
+        [f"{number}. {question['question_text']}"]
+        + [f"{letter}) {option}" for letter, option in zip("ABCD", question["options"])]
+        for number, question in enumerate(questions, 1)
+    ])
+
+
+def continuous_pages(questions: List[GoldenQuestion]) -> List[List[str]]:
+    """Stems and options run together in wrapped paragraphs"""
+    return _paginate([
+        textwrap.wrap(
+            f"{number}. {question['question_text']} "
+            + " ".join(f"{letter}. {option}" for letter, option in zip("ABCD", question["options"])),
+            WRAP_WIDTH,
+        )
+        for number, question in enumerate(questions, 1)
+    ])
+
+
+FORMATS: Dict[str, Callable[[List[GoldenQuestion]], List[List[str]]]] = {
+    "moodle": moodle_pages,
+    "multiline": multiline_pages,
+    "numbered": numbered_pages,
+    "continuous": continuous_pages,
+}
+
+
+def generate(format_name: str, page_count: int, seed: int = 0) -> Tuple[bytes, List[GoldenQuestion]]:
+    """A PDF of at least page_count pages in the given format, with its golden set"""
+    layout = FORMATS[format_name]
+    # Grow the question count until the layout fills the requested pages
+    count = max(1, page_count * 4)
+    while True:
+        questions = random_questions(count, seed)
+        pages = layout(questions)
+        if len(pages) >= page_count:
+            break
+        count = count * page_count // len(pages) + 1
+    while len(pages) > page_count and count > 1:
+        count -= max(1, (len(pages) - page_count) * count // len(pages))
+        questions = random_questions(count, seed)
+        pages = layout(questions)
+    return build_pdf(pages), questions
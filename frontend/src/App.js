@@ -792,6 +792,10 @@ const AdminPanel = ({ onCourseCreated }) => {
   });
   const [uploading, setUploading] = useState(false);
   const [uploadResult, setUploadResult] = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(null);
+  const [bulkFiles, setBulkFiles] = useState([]);
+  const [bulkManifest, setBulkManifest] = useState(null);
+  const [bulkBatch, setBulkBatch] = useState(null);
 
   const fetchAdminCourses = async () => {
     setLoadingCourses(true);
@@ -805,6 +809,19 @@ const AdminPanel = ({ onCourseCreated }) => {
     }
   };
 
+  const waitForIngestionJob = async (jobId) => {
+    // Uploads are parsed in the background; poll until the job settles
+    while (true) {
+      const response = await axios.get(`${API}/admin/jobs/${jobId}`);
+      setUploadProgress(response.data.progress);
+      if (response.data.state === 'completed' || response.data.state === 'failed') {
+        setUploadProgress(null);
+        return response.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+    }
+  };
+
   const handleUpload = async (e) => {
     e.preventDefault();
     if (!uploadData.pdf_file) {
@@ -824,7 +841,12 @@ const AdminPanel = ({ onCourseCreated }) => {
       const response = await axios.post(`${API}/admin/courses/upload`, formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
-      setUploadResult(response.data);
+      const job = await waitForIngestionJob(response.data.job_id);
+      if (job.state === 'failed') {
+        alert('Upload failed: ' + (job.errors[job.errors.length - 1] || 'Unknown error'));
+        return;
+      }
+      setUploadResult(job);
       setUploadData({
         title: '',
         description: '',
@@ -843,6 +865,82 @@ const AdminPanel = ({ onCourseCreated }) => {
     }
   };
 
+  const waitForIngestionBatch = async (batchId) => {
+    while (true) {
+      const response = await axios.get(`${API}/admin/batches/${batchId}`);
+      setBulkBatch(response.data);
+      if (response.data.state === 'completed') {
+        return response.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
+  const handleBulkUpload = async (e) => {
+    e.preventDefault();
+    if (!bulkFiles.length) {
+      alert('Please select PDF files or a ZIP archive');
+      return;
+    }
+
+    setUploading(true);
+    const formData = new FormData();
+    bulkFiles.forEach((file) => formData.append('files', file));
+    if (bulkManifest) {
+      formData.append('manifest', bulkManifest);
+    }
+
+    try {
+      const response = await axios.post(`${API}/admin/courses/bulk-upload`, formData, {
+        headers: { 'Content-Type': 'multipart/form-data' }
+      });
+      const batch = await waitForIngestionBatch(response.data.batch_id);
+      const problems = batch.files.filter((file) => file.error);
+      alert(`${batch.courses_created} courses created from ${batch.summary.files} files.` +
+            (problems.length ? '\n\n' + problems.map((file) => `${file.filename}: ${file.error}`).join('\n') : ''));
+      setBulkFiles([]);
+      setBulkManifest(null);
+      onCourseCreated();
+      if (showCourses) {
+        fetchAdminCourses();
+      }
+    } catch (error) {
+      const detail = error.response?.data?.detail;
+      alert('Bulk upload failed: ' + (detail?.message || detail || 'Unknown error'));
+    } finally {
+      setUploading(false);
+      setBulkBatch(null);
+    }
+  };
+
+  const handleReimportCourse = async (courseId, file) => {
+    if (!file) return;
+    const formData = new FormData();
+    formData.append('pdf_file', file);
+
+    setUploading(true);
+    try {
+      const response = await axios.post(`${API}/admin/courses/${courseId}/reimport`, formData, {
+        headers: { 'Content-Type': 'multipart/form-data' }
+      });
+      const job = await waitForIngestionJob(response.data.job_id);
+      if (job.state === 'failed') {
+        alert('Re-import failed: ' + (job.errors[job.errors.length - 1] || 'Unknown error'));
+        return;
+      }
+      const changes = job.changes;
+      alert(`Re-import complete: ${changes.added} added, ${changes.changed} changed, ` +
+            `${changes.removed} removed, ${changes.unchanged} unchanged.` +
+            (changes.answers_reset ? `\n${changes.answers_reset} changed questions need their answer checked.` : ''));
+      fetchAdminCourses();
+      onCourseCreated();
+    } catch (error) {
+      alert('Re-import failed: ' + (error.response?.data?.detail || 'Unknown error'));
+    } finally {
+      setUploading(false);
+    }
+  };
+
   const handleDeleteCourse = async (courseId, courseTitle) => {
     const confirmed = window.confirm(
       `Are you sure you want to delete the course "${courseTitle}"?\n\n` +
@@ -900,6 +998,11 @@ const AdminPanel = ({ onCourseCreated }) => {
       {uploadResult && (
         <div className="bg-green-100 border border-green-400 text-green-700 px-4 py-3 rounded mb-4">
           Course uploaded successfully! Extracted {uploadResult.questions_extracted} questions.
+          {uploadResult.pages_without_text?.length > 0 && (
+            <div className="text-yellow-700 mt-1">
+              Pages without a text layer (scanned?): {uploadResult.pages_without_text.join(', ')}
+            </div>
+          )}
         </div>
       )}
 
@@ -972,7 +1075,53 @@ const AdminPanel = ({ onCourseCreated }) => {
             disabled={uploading}
             className="bg-red-800 text-white px-6 py-2 rounded hover:bg-red-900 disabled:opacity-50"
           >
-            {uploading ? 'Uploading...' : 'Upload Course'}
+            {uploading
+              ? (uploadProgress && uploadProgress.pages_total
+                  ? `Parsing page ${uploadProgress.pages_done} of ${uploadProgress.pages_total}...`
+                  : 'Uploading...')
+              : 'Upload Course'}
+          </button>
+        </form>
+      )}
+
+      {showUpload && (
+        <form onSubmit={handleBulkUpload} className="bg-white rounded-lg p-6 mb-4">
+          <h3 className="text-lg font-semibold text-gray-800 mb-2">Bulk Upload</h3>
+          <p className="text-gray-600 text-sm mb-4">
+            Several PDFs or one ZIP archive, one course per PDF. An optional manifest (CSV or JSON with
+            file, title, description and price columns) sets each course's details.
+          </p>
+
+          <div className="grid md:grid-cols-2 gap-4 mb-4">
+            <div>
+              <label className="block text-gray-700 font-semibold mb-2">PDF Files or ZIP</label>
+              <input
+                type="file"
+                accept=".pdf,.zip"
+                multiple
+                onChange={(e) => setBulkFiles(Array.from(e.target.files))}
+                className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-red-500"
+              />
+            </div>
+            <div>
+              <label className="block text-gray-700 font-semibold mb-2">Manifest (optional)</label>
+              <input
+                type="file"
+                accept=".csv,.json"
+                onChange={(e) => setBulkManifest(e.target.files[0] || null)}
+                className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-red-500"
+              />
+            </div>
+          </div>
+
+          <button
+            type="submit"
+            disabled={uploading}
+            className="bg-red-800 text-white px-6 py-2 rounded hover:bg-red-900 disabled:opacity-50"
+          >
+            {bulkBatch
+              ? `Parsed ${bulkBatch.summary.completed + bulkBatch.summary.failed} of ${bulkBatch.summary.files - bulkBatch.summary.rejected} files...`
+              : 'Upload All'}
           </button>
         </form>
       )}
@@ -1011,6 +1160,22 @@ const AdminPanel = ({ onCourseCreated }) => {
                         </div>
                       </div>
                       <div className="flex space-x-2 ml-4">
+                        <label
+                          className={`bg-blue-600 text-white px-3 py-1 rounded text-sm hover:bg-blue-700 transition-colors ${uploading ? 'opacity-50 cursor-not-allowed' : 'cursor-pointer'}`}
+                          title="Parse a new PDF into this course, keeping unchanged questions, answers and attempts"
+                        >
+                          Re-import PDF
+                          <input
+                            type="file"
+                            accept=".pdf"
+                            className="hidden"
+                            disabled={uploading}
+                            onChange={(e) => {
+                              handleReimportCourse(course.id, e.target.files[0]);
+                              e.target.value = '';
+                            }}
+                          />
+                        </label>
                         <button
                           onClick={() => handleDeleteCourse(course.id, course.title)}
                           className="bg-red-600 text-white px-3 py-1 rounded text-sm hover:bg-red-700 transition-colors"
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The backend is run from its own directory (uvicorn server:app), so make its
+# modules importable the same way here.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,51 @@
+import asyncio
+from array import array
+
+from app import answer_keys
+
+
+class _Questions:
+    """Just enough of a questions collection for find().sort().to_list()"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.loads = 0
+
+    def find(self, query, projection):
+        return self
+
+    def sort(self, field, direction):
+        return self
+
+    async def to_list(self, length):
+        self.loads += 1
+        return [{"id": d["id"], "correct_answer": d["correct_answer"]} for d in self.documents]
+
+
+class _Db:
+    def __init__(self, documents):
+        self.questions = _Questions(documents)
+
+
+def test_grading_ignores_unknown_questions():
+    key = answer_keys.AnswerKey("v1", ("q1", "q2", "q3"), array("i", [2, 0, 1]))
+
+    assert len(key) == 3
+    assert key.grade({"q1": 2, "q2": 1, "q3": 1, "elsewhere": 0}) == 2
+
+
+def test_keys_are_reloaded_when_the_version_changes():
+    answer_keys.clear()
+    db = _Db([{"id": "q1", "correct_answer": 1}, {"id": "q2", "correct_answer": 3}])
+
+    async def grade(version, answers):
+        return (await answer_keys.get_answer_key(db, "course", version)).grade(answers)
+
+    assert asyncio.run(grade("v1", {"q1": 1, "q2": 3})) == 2
+    db.questions.documents[1]["correct_answer"] = 0
+    assert asyncio.run(grade("v1", {"q1": 1, "q2": 3})) == 2  # cached
+    assert db.questions.loads == 1
+    assert asyncio.run(grade("v2", {"q1": 1, "q2": 3})) == 1
+    answer_keys.invalidate("course")
+    assert asyncio.run(grade("v2", {"q1": 1, "q2": 0})) == 2
+    assert db.questions.loads == 3
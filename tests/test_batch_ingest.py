@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from app.batch_ingest import Progress, find_pdfs
+from app.models import Question
+from app.pdf_parser import ExtractedDocument, question_pages
+
+
+def test_question_pages_follow_wrapped_stems():
+    document = ExtractedDocument.from_pages([
+        "Q1. What is the capital\nof Nigeria today?\nA. Lagos\nB. Abuja",
+        "",
+        "Q2. Which river is the\nlongest in Africa?\nA. Nile\nB. Niger",
+    ])
+    questions = [
+        Question(question_text="What is the capital of Nigeria today?", options=["Lagos", "Abuja"], correct_answer=0),
+        Question(question_text="Which river is the longest in Africa?", options=["Nile", "Niger"], correct_answer=0),
+        Question(question_text="Not in the document at all", options=["Yes", "No"], correct_answer=0),
+    ]
+
+    assert question_pages(document, questions) == [0, 2, None]
+
+
+def test_progress_resumes_after_interrupted_record(tmp_path: Path):
+    pdf = tmp_path / "exam.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    assert find_pdfs([str(tmp_path)]) == [pdf.resolve()]
+
+    progress = Progress(tmp_path / "out.progress")
+    progress.record({"path": str(pdf), "content_hash": "abc", "questions": [{}] * 3}, output_size=120)
+    progress.close()
+    with open(tmp_path / "out.progress", "a") as progress_file:
+        progress_file.write('{"path": "half a rec')
+
+    resumed = Progress(tmp_path / "out.progress")
+    assert resumed.is_done(pdf)
+    assert resumed.output_size == 120
+    resumed.record({"path": str(pdf), "content_hash": "abc", "questions": []}, output_size=120)
+    resumed.close()
+
+    assert len(Progress(tmp_path / "out.progress").done) == 1
@@ -0,0 +1,51 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from app.pdf_parser import parse_continuous_text, parse_pdf_to_questions
+
+GST104_PDF = Path(__file__).resolve().parent.parent / "GST104.pdf"
+
+
+def test_inline_numbered_questions():
+    text = (
+        "1. Which of the following is a mammal? A. Shark fish B. Whale shark "
+        "C. Blue whale D. Tuna fish 2. What is the capital of Nigeria today? "
+        "A) Lagos B) Abuja C) Ibadan D) Kaduna\n"
+    )
+    questions = parse_continuous_text(text)
+
+    assert [q.question_text for q in questions] == [
+        "Which of the following is a mammal?",
+        "What is the capital of Nigeria today?",
+    ]
+    assert questions[0].options == ["Shark fish", "Whale shark", "Blue whale", "Tuna fish"]
+    assert questions[1].options == ["Lagos", "Abuja", "Ibadan", "Kaduna"]
+
+
+def test_options_may_contain_capital_letters():
+    text = "Who wrote the laws of library science in India? A. S.R Ranganathan B. Melvil Dewey C. Charles Ammi Cutter"
+    questions = parse_continuous_text(text)
+
+    assert len(questions) == 1
+    assert questions[0].options == ["S.R Ranganathan", "Melvil Dewey", "Charles Ammi Cutter"]
+
+
+def test_pathological_input_finishes_within_budget():
+    # Long prose with no sentence ends and a lone option marker made the old
+    # regex patterns backtrack quadratically (minutes at this size).
+    text = ("lorem ipsum dolor sit amet " * 40000) + " A. x " + ("9" * 50000)
+
+    started = time.perf_counter()
+    assert parse_continuous_text(text) == []
+    assert time.perf_counter() - started < 1.0
+
+
+@pytest.mark.skipif(not GST104_PDF.exists(), reason="GST104.pdf not available")
+def test_gst104_extraction_unchanged():
+    questions = parse_pdf_to_questions(GST104_PDF.read_bytes())
+
+    assert len(questions) == 35
+    assert questions[0].question_text == "Two examples of general library services are :"
+    assert all(len(q.options) == 4 for q in questions)
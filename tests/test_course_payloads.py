@@ -0,0 +1,39 @@
+import gzip
+
+from fastapi.responses import JSONResponse
+
+from app.course_payloads import payload_document, render
+
+
+def _course():
+    return {
+        "id": "course", "title": "GST 104", "description": "Use of library – past questions",
+        "total_questions": 2, "answers_version": "v7", "is_free": True,
+    }
+
+
+def _questions():
+    return [
+        {"id": "q1", "question_text": "Which is a catalogue?", "options": ["OPAC", "Índex"], "correct_answer": 0},
+        {"id": "q2", "question_text": "Pick “B”", "options": ["A", "B"], "correct_answer": 1},
+    ]
+
+
+def test_payload_matches_fastapi_encoding_without_answers():
+    payload = render(_course(), _questions())
+    view = {
+        "id": "course", "title": "GST 104", "description": "Use of library – past questions", "total_questions": 2,
+        "questions": [{k: q[k] for k in ("id", "question_text", "options")} for q in _questions()],
+    }
+
+    assert payload.version == "v7"
+    assert payload.body == JSONResponse(view).body
+    assert b"correct_answer" not in payload.body
+    assert gzip.decompress(payload.gzipped) == payload.body
+
+
+def test_stored_document_is_deterministic():
+    first = payload_document(_course(), _questions())._doc
+    second = payload_document(_course(), _questions())._doc
+
+    assert first["gzipped"] == second["gzipped"] and first["version"] == "v7"
@@ -0,0 +1,58 @@
+from app.dedup import find_duplicate_clusters
+from app.models import Question
+from app.pdf_parser import remove_duplicate_questions
+
+
+def _question(text, options):
+    return Question(question_text=text, options=options, correct_answer=0)
+
+
+def test_keeps_best_formed_copy_in_first_position():
+    questions = [
+        _question("1. Which of these is the capital of France? Select one:", ["Paris", "Lyon", "Nice"]),
+        _question("What is the largest planet in the solar system?", ["Mars", "Jupiter", "Venus", "Earth"]),
+        _question("Which of these is the capital of France?", ["Paris", "Lyon", "Nice", "Lille"]),
+    ]
+    unique = remove_duplicate_questions(questions)
+
+    assert [q.question_text for q in unique] == [
+        "Which of these is the capital of France?",
+        "What is the largest planet in the solar system?",
+    ]
+    assert len(unique[0].options) == 4
+
+
+def test_shared_stem_with_different_options_is_not_a_duplicate():
+    stem = "Which of the following statements about the history of the national library is correct?"
+    questions = [
+        _question(stem, ["It opened in 1964", "It has no branches", "It is privately run", "None"]),
+        _question(stem, ["It lends rare books", "It was founded by decree", "It is in Lagos", "All"]),
+    ]
+
+    assert len(remove_duplicate_questions(questions)) == 2
+
+
+def test_long_shared_stem_with_different_options_is_not_a_duplicate():
+    stem = (
+        "Read the following passage about the history of the university library and its role in the"
+        " academic life of students and staff across the faculties, then choose the statement that best"
+        " describes what the passage says about it"
+    )
+    assert len(stem.split()) > 30
+    questions = [
+        _question(stem, ["It opened in 1964", "It has no branches", "It is privately run", "None"]),
+        _question(stem, ["It lends rare books", "It was founded by decree", "It is in Lagos", "All"]),
+    ]
+
+    assert len(remove_duplicate_questions(questions)) == 2
+
+
+def test_clusters_across_courses():
+    entries = [
+        {"course_id": "a", "question_text": "Define a library catalogue.", "options": ["A list", "A map", "A room", "A shelf"]},
+        {"course_id": "b", "question_text": "2. Define a library catalogue", "options": ["A list", "A map", "A room", "A shelf"]},
+        {"course_id": "b", "question_text": "Define a bibliography.", "options": ["A list", "A map", "A room", "A shelf"]},
+    ]
+    clusters = find_duplicate_clusters(entries)
+
+    assert [[e["course_id"] for e in cluster] for cluster in clusters] == [["a", "b"]]
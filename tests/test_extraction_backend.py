@@ -0,0 +1,24 @@
+from benchmarks import synthetic
+from app.metrics import ParseMetrics
+from app.pdf_parser import BACKEND_PDFPLUMBER, BACKEND_PYPDF2, extract_and_parse, layout_problems
+
+
+def test_layout_problems_flags_split_words():
+    clean = "1. Which of these is a library catalogue?\nA. OPAC\nB. Index\nC. Abstract\nD. Atlas\n" * 5
+    garbled = "T ranslation of the A wareness r eview ,\nhttps://elearn.example/mod/quiz/r eview .php\n" * 5
+
+    assert layout_problems([clean]) == []
+    assert "split_words" in layout_problems([garbled])
+    assert layout_problems(["", ""]) == ["no_text"]
+
+
+def test_clean_pdf_keeps_fast_backend():
+    pdf_content, golden = synthetic.generate("moodle", 3)
+    metrics = ParseMetrics()
+
+    outcome = extract_and_parse(pdf_content, metrics=metrics)
+
+    assert outcome.backend == BACKEND_PYPDF2
+    assert len(outcome.questions) == len(golden)
+    assert "fallback" not in metrics.to_dict()["stages"]["fast_extract"]
+    assert extract_and_parse(pdf_content, backend=BACKEND_PDFPLUMBER).backend == BACKEND_PDFPLUMBER
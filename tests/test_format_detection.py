@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks import synthetic
+from app.pdf_parser import detect_format, extract_document, parse_extracted_document, parse_gst104_format
+
+
+@pytest.mark.parametrize("format_name", sorted(synthetic.FORMATS))
+def test_routing_finds_every_question(format_name):
+    pdf_content, golden = synthetic.generate(format_name, 4)
+    document = extract_document(pdf_content)
+
+    assert len(parse_extracted_document(document)) == len(golden)
+
+
+def test_numbered_questions_go_to_the_multiline_parser_first():
+    pdf_content, _ = synthetic.generate("numbered", 4)
+    ranked = detect_format(extract_document(pdf_content))
+
+    assert ranked[0][0].name == "multiline"
+
+
+def test_stem_starting_with_select_one_is_not_the_moodle_marker():
+    text = (
+        "Quiz review\n"
+        "1\nQuestion\nComplete\nMark 1.00 out of 1.00\n"
+        "Select one of the options that best defines a library catalogue.\n"
+        "Select one:\nA list of holdings\nA reading room\nA shelf mark\nA loan record\n"
+        "2\nQuestion\nComplete\nMark 1.00 out of 1.00\n"
+        "Which of these is a reference source?\n"
+        "Select one\nAn encyclopaedia\nA novel\nA magazine\nA poster\n"
+    )
+    questions = parse_gst104_format(text)
+
+    assert [q.question_text for q in questions] == [
+        "Select one of the options that best defines a library catalogue.",
+        "Which of these is a reference source?",
+    ]
+    assert questions[0].options == ["A list of holdings", "A reading room", "A shelf mark", "A loan record"]
@@ -0,0 +1,31 @@
+import random
+from array import array
+
+from app.answer_keys import AnswerKey
+from app.grading import score_matrix, selection_matrix
+
+
+def test_vectorized_scores_match_single_attempt_grading():
+    rng = random.Random(23)
+    key = AnswerKey("v", tuple(f"q{i}" for i in range(40)), array("i", [rng.randrange(4) for _ in range(40)]))
+    attempts = [
+        {f"q{i}": rng.choice([0, 1, 2, 3, -1, 2**40]) for i in range(40) if rng.random() < 0.8}
+        for _ in range(200)
+    ]
+    attempts.append({"removed-question": 0})
+    attempts.append({})
+
+    correct, scores = score_matrix(selection_matrix(attempts, key), key)
+
+    for answers, count, score in zip(attempts, correct.tolist(), scores.tolist()):
+        expected = key.grade(answers)
+        assert count == expected
+        # Bit-identical to submit_test_attempt, so unchanged attempts are not rewritten
+        assert score == (expected / len(key)) * 100
+
+
+def test_course_without_questions_scores_zero():
+    key = AnswerKey("v", (), array("i"))
+    correct, scores = score_matrix(selection_matrix([{"q1": 0}], key), key)
+
+    assert correct.tolist() == [0] and scores.tolist() == [0.0]
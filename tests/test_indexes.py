@@ -0,0 +1,42 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from app import indexes
+
+MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+
+def test_every_hot_query_has_a_declared_index():
+    assert indexes.unindexed_queries() == []
+
+
+def test_hot_queries_avoid_collection_scans():
+    async def check():
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except PyMongoError:
+            client.close()
+            return None
+        db = client[f"index_check_{uuid.uuid4().hex[:12]}"]
+        try:
+            first = await indexes.ensure_indexes(db)
+            second = await indexes.ensure_indexes(db)
+            return first, second, await indexes.find_collscans(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    result = asyncio.run(check())
+    if result is None:
+        pytest.skip(f"no MongoDB at {MONGO_URL}")
+    first, second, collscans = result
+
+    assert len(first["created"]) == len(indexes.INDEXES) and not first["failed"]
+    assert second["created"] == [] and second["missing"] == second["conflicting"] == second["undeclared"] == []
+    assert collscans == []
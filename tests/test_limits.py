@@ -0,0 +1,31 @@
+import signal
+
+import pytest
+
+from benchmarks import synthetic
+from app import limits
+from app.limits import ResourceLimitExceeded
+from app.pdf_parser import BACKEND_PDFPLUMBER, BACKEND_PYPDF2, extract_and_parse
+
+
+@pytest.mark.parametrize("backend", [BACKEND_PYPDF2, BACKEND_PDFPLUMBER])
+def test_page_cap_stops_extraction(monkeypatch, backend):
+    pdf_content, _ = synthetic.generate("moodle", 3)
+    monkeypatch.setattr(limits, "MAX_PAGES", 2)
+
+    with pytest.raises(ResourceLimitExceeded, match="3 pages"):
+        extract_and_parse(pdf_content, backend=backend)
+
+
+def test_cpu_budget_interrupts_catch_all_handlers():
+    previous = signal.signal(signal.SIGXCPU, limits._cpu_time_exceeded)
+    try:
+        with pytest.raises(ResourceLimitExceeded):
+            with limits.cpu_budget(1):
+                while True:
+                    try:
+                        sum(range(100000))
+                    except Exception:
+                        continue
+    finally:
+        signal.signal(signal.SIGXCPU, previous)
@@ -0,0 +1,44 @@
+from app.metrics import ParseMetrics, Registry, summarize_parses
+from app.pdf_parser import ExtractedDocument, parse_extracted_document
+
+
+def test_parse_records_method_yield_and_contribution():
+    document = ExtractedDocument.from_pages([
+        "Q1. What is the capital of Nigeria today?\nA. Lagos\nB. Abuja\nC. Kano\nD. Jos\n"
+        "Q2. Which river is the longest in Africa?\nA. Nile\nB. Niger\nC. Congo\nD. Benue\n"
+    ])
+    metrics = ParseMetrics()
+    questions = parse_extracted_document(document, metrics)
+    recorded = metrics.to_dict()
+
+    assert len(questions) == 2
+    assert sum(method["contributed"] for method in recorded["methods"].values()) == 2
+    assert recorded["stages"]["dedup"]["unique"] == 2
+    assert "detect" in recorded["stages"]
+
+
+def test_summary_flags_methods_that_never_contribute():
+    parse = {
+        "stages": {"open": {"ms": 10.0}},
+        "methods": {
+            "multiline": {"ms": 4.0, "found": 10, "contributed": 10},
+            "continuous": {"ms": 6.0, "found": 3, "contributed": 0},
+        },
+    }
+    summary = summarize_parses([parse, parse])
+
+    assert summary["parses"] == 2
+    assert summary["methods"]["multiline"]["contribution_rate"] == 1.0
+    assert summary["methods"]["continuous"]["contribution_rate"] == 0.0
+    assert summary["methods"]["continuous"]["avg_ms"] == 6.0
+
+
+def test_registry_keys_series_by_labels():
+    registry = Registry()
+    registry.inc("loads", course="a")
+    registry.inc("loads", course="a")
+    registry.observe("load", 5.0, course="b")
+
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == {"loads{course=a}": 2}
+    assert snapshot["timings"]["load{course=b}"]["count"] == 1
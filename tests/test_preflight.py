@@ -0,0 +1,19 @@
+from benchmarks import synthetic
+from app.preflight import check_text_layer, page_ranges
+
+
+def test_image_only_pdf_is_rejected():
+    report = check_text_layer(synthetic.build_pdf([[], [], []]))
+
+    assert report.pages_without_text == [1, 2, 3]
+    assert "no text layer" in report.rejection()
+
+
+def test_pages_without_text_are_reported():
+    text_page = ["1. Which of these is a library catalogue?", "A. OPAC", "B. Index", "C. Abstract", "D. Atlas"]
+    report = check_text_layer(synthetic.build_pdf([text_page, [], ["12"], text_page]))
+
+    # A bare page number is not a text layer
+    assert report.pages_without_text == [2, 3]
+    assert report.rejection() is None
+    assert page_ranges([1, 2, 3, 7, 9, 10]) == "1-3, 7, 9-10"
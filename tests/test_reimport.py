@@ -0,0 +1,73 @@
+from app.models import Question
+from app.question_store import question_documents
+from app.reimport import diff_questions, update_operations
+
+
+def _course(count, ordinals=None):
+    # Stored questions, as loaded with their ordinals
+    return question_documents("course", [
+        Question(question_text=f"Which library holds record {i}?", options=[f"r{i}a", f"r{i}b", f"r{i}c"],
+                 correct_answer=2)
+        for i in range(count)
+    ], ordinals)
+
+
+def _parsed(existing):
+    # A fresh parse: same text, new ids, default answers
+    return [Question(question_text=q["question_text"], options=list(q["options"]), correct_answer=0) for q in existing]
+
+
+def test_small_edit_keeps_ids_and_answers():
+    existing = _course(100)
+    parsed = _parsed(existing)
+    del parsed[40]
+    parsed[10].options = ["r10c", "r10a", "new option"]
+    parsed.insert(50, Question(question_text="A question added in the new edition?", options=["x", "y"], correct_answer=0))
+
+    diff = diff_questions(existing, parsed)
+
+    assert diff.summary() == {"added": 1, "changed": 1, "removed": 1, "unchanged": 98, "answers_reset": 0}
+    assert diff.removed == [existing[40]["id"]]
+    assert [q["id"] for q in diff.questions[:10]] == [q["id"] for q in existing[:10]]
+    # The correct option moved from index 2 to index 0
+    assert diff.questions[10]["correct_answer"] == 0
+    assert diff.questions[11]["correct_answer"] == 2
+    # Questions between the removed and the added one keep their ordinals
+    assert diff.moved == []
+    operations = update_operations("course", diff)
+    # One delete, one update for the changed question, one insert
+    assert len(operations) == 3
+    inserted = operations[-1]._doc
+    assert existing[50]["ordinal"] < inserted["ordinal"] < existing[51]["ordinal"]
+    assert inserted["course_id"] == "course"
+
+
+def test_removing_one_question_writes_only_the_delete():
+    existing = _course(1000)
+    diff = diff_questions(existing, _parsed(existing)[:1] + _parsed(existing)[2:])
+
+    assert diff.summary()["removed"] == 1 and diff.summary()["unchanged"] == 999
+    assert len(update_operations("course", diff)) == 1
+
+
+def test_densely_numbered_course_is_renumbered_when_there_is_no_room():
+    existing = _course(5, ordinals=range(5))
+    parsed = _parsed(existing)
+    parsed.insert(2, Question(question_text="A question added between two others?", options=["x", "y"], correct_answer=0))
+
+    diff = diff_questions(existing, parsed)
+
+    assert diff.ordinals == sorted(set(diff.ordinals)) and len(diff.ordinals) == 6
+    assert len(update_operations("course", diff)) == 1 + len(diff.moved)
+
+
+def test_reordered_questions_only_update_ordinals():
+    existing = _course(3)
+    diff = diff_questions(existing, _parsed(existing)[::-1])
+
+    assert [q["id"] for q in diff.questions] == [q["id"] for q in existing[::-1]]
+    assert diff.changed == [] and len(diff.moved) == 2
+    assert diff.ordinals == sorted(diff.ordinals)
+    assert [operation._doc for operation in update_operations("course", diff)] == [
+        {"$set": {"ordinal": diff.ordinals[index]}} for index in diff.moved
+    ]
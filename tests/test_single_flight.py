@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app import metrics
+from app.single_flight import SingleFlight
+
+
+def test_concurrent_lookups_share_one_load():
+    flight = SingleFlight("test_shared")
+    loads = []
+
+    async def load(key):
+        loads.append(key)
+        await asyncio.sleep(0.01)
+        return {"id": key}
+
+    async def run():
+        results = await asyncio.gather(*[flight.do(key, lambda key=key: load(key)) for key in ["a"] * 50 + ["b"] * 5])
+        # Finished loads are forgotten, so the next lookup loads again
+        await flight.do("a", lambda: load("a"))
+        return results
+
+    results = asyncio.run(run())
+
+    assert loads == ["a", "b", "a"]
+    assert all(result is results[0] for result in results[:50])
+    assert len(flight) == 0
+    counters = metrics.REGISTRY.snapshot("single_flight{flight=test_shared")["counters"]
+    assert counters == {
+        "single_flight{flight=test_shared,result=coalesced}": 53,
+        "single_flight{flight=test_shared,result=loaded}": 3,
+    }
+
+
+def test_errors_are_shared_and_cancelled_callers_do_not_cancel_the_load():
+    flight = SingleFlight("test_errors")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise LookupError("no such course")
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return "course"
+
+    async def run():
+        failures = await asyncio.gather(*[flight.do("x", failing) for _ in range(3)], return_exceptions=True)
+        leader = asyncio.ensure_future(flight.do("y", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("y", slow))
+        leader.cancel()
+        return failures, await follower, leader
+
+    failures, followed, leader = asyncio.run(run())
+
+    assert all(isinstance(failure, LookupError) for failure in failures)
+    assert followed == "course" and leader.cancelled()
+    with pytest.raises(asyncio.CancelledError):
+        leader.result()